@@ -1,27 +1,41 @@
 from __future__ import annotations
 
-import json
+import atexit
 import os
+import weakref
+from collections import deque
 from dataclasses import asdict, dataclass, field
-from typing import Dict, List, Optional
+from typing import Deque, Dict, List, Optional
 
+from gsa import jsonio
+
+
+# 每累计多少次 record_op 落盘一次，其余在进程退出时补写
+SAVE_EVERY_OPS = 10
+MAX_RECENT_OPS = 20
+MAX_RECENT_FILES = 50
 
 @dataclass
 class SessionMemory:
     workspace: str = ""
     last_plan: Optional[Dict[str, object]] = None
-    recent_files: List[str] = field(default_factory=list)
+    recent_files: Deque[str] = field(default_factory=lambda: deque(maxlen=MAX_RECENT_FILES))
     recent_branch: str = ""
     preferences: Dict[str, object] = field(default_factory=dict)
 
 
 @dataclass
 class PersistentMemory:
-    recent_ops: List[str] = field(default_factory=list)
+    recent_ops: Deque[str] = field(default_factory=lambda: deque(maxlen=MAX_RECENT_OPS))
     default_dry_run: bool = True
     common_workspaces: List[str] = field(default_factory=list)
     index_config: Dict[str, object] = field(default_factory=dict)
 
+    def __post_init__(self) -> None:
+        # 从 JSON 加载时是 list，统一转成定长 deque
+        if not isinstance(self.recent_ops, deque) or self.recent_ops.maxlen != MAX_RECENT_OPS:
+            self.recent_ops = deque(self.recent_ops, maxlen=MAX_RECENT_OPS)
+
 
 class MemoryStore:
     """会话 + 持久化记忆管理。"""
@@ -31,31 +45,67 @@ class MemoryStore:
         self.session = SessionMemory(workspace=workspace)
         self.persist = PersistentMemory()
         self.path = os.path.join(workspace, ".gsa", "memory.json")
+        self._dirty = False
+        self._ops_since_save = 0
+        self._dir_ready = False
         self._load()
+        _STORES.add(self)
 
     def _load(self) -> None:
-        if not os.path.exists(self.path):
-            return
         try:
-            with open(self.path, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            with open(self.path, "rb") as f:
+                data = jsonio.loads(f.read())
             self.persist = PersistentMemory(**data)
+        except FileNotFoundError:
+            return
         except Exception:
             return
 
     def save(self) -> None:
-        os.makedirs(os.path.dirname(self.path), exist_ok=True)
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(asdict(self.persist), f, ensure_ascii=False, indent=2)
+        if not self._dir_ready:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._dir_ready = True
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(jsonio.dumps(asdict(self.persist)))
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self._ops_since_save = 0
+
+    def flush(self) -> None:
+        """有未落盘的变更时写入磁盘。"""
+        if not self._dirty:
+            return
+        try:
+            self.save()
+        except OSError:
+            return
 
     def clear(self) -> None:
         self.persist = PersistentMemory()
-        if os.path.exists(self.path):
+        self._dirty = False
+        self._ops_since_save = 0
+        try:
             os.remove(self.path)
+        except FileNotFoundError:
+            pass
 
     def record_op(self, summary: str) -> None:
         self.persist.recent_ops.append(summary)
-        self.persist.recent_ops = self.persist.recent_ops[-20:]
         if self.workspace not in self.persist.common_workspaces:
             self.persist.common_workspaces.append(self.workspace)
-        self.save()
+        self._dirty = True
+        self._ops_since_save += 1
+        if self._ops_since_save >= SAVE_EVERY_OPS:
+            self.save()
+
+
+# 进程内存活的记忆实例；弱引用，被淘汰的 Orchestrator 不会因退出钩子而常驻内存
+_STORES: "weakref.WeakSet[MemoryStore]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all() -> None:
+    """进程退出时补写所有实例中未落盘的变更。"""
+    for store in list(_STORES):
+        store.flush()
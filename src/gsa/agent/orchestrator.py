@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, List, Optional
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Generator, Iterator, List, Optional, Tuple
 
 from gsa.agent.memory import MemoryStore
 from gsa.agent.planner import Planner
-from gsa.agent.schema import Plan, PlanResult
-from gsa.mcp.client import MCPClient
+from gsa.agent.schema import Plan, PlanResult, Step
+from gsa.mcp import client as mcp_client
 from gsa.observability.logger import EventLogger
 from gsa.observability.report import write_run_report
 from gsa.observability.trace import new_trace_id
@@ -14,6 +18,54 @@ from gsa.safety.confirmer import apply_confirmation
 from gsa.safety.validator import validate_plan
 
 
+# 已规划但尚未执行的 trace 最多保留多少个日志器
+MAX_PENDING_LOGGERS = 32
+# MCP 工具列表缓存时长（秒）
+TOOLS_CACHE_TTL = 30.0
+
+_BRANCH_TOOLS = frozenset({"git_switch", "git_create_branch", "git_delete_branch"})
+_FILE_TOOLS = frozenset({"file_write", "file_patch", "file_read"})
+# 不改动工作区、且只做本地读取的廉价工具：连续出现时可以流水线批量发送给 MCP。
+# 调用 LLM 的工具（repo_summarize 等）不在其中：预取时前面的步骤即使失败也已产生费用
+_READ_ONLY_TOOLS = frozenset(
+    {
+        "git_status",
+        "git_diff",
+        "git_log",
+        "git_log_graph",
+        "git_branch_list",
+        "git_remote_list",
+        "git_show",
+        "git_cat_file",
+        "repo_snapshot",
+        "file_list",
+        "file_read",
+        "file_search",
+        "index_status",
+        "index_search",
+    }
+)
+# 单批最多预取的只读调用数
+MAX_PIPELINED_CALLS = 16
+
+def _release(memory: MemoryStore, mcp: Any) -> None:
+    try:
+        memory.flush()
+    finally:
+        mcp.close()
+
+
+class PlanStream:
+    """包装流式规划：迭代得到 LLM 输出片段，迭代结束后 result 为最终 PlanResult。"""
+
+    def __init__(self, gen: Generator[str, None, PlanResult]):
+        self._gen = gen
+        self.result: Optional[PlanResult] = None
+
+    def __iter__(self) -> Iterator[str]:
+        self.result = yield from self._gen
+
+
 class Orchestrator:
     """核心编排器：规划 -> 校验 -> 执行 -> 总结。"""
 
@@ -22,67 +74,171 @@ class Orchestrator:
         self.use_llm = use_llm
         self.memory = MemoryStore(workspace)
         self.planner = Planner(workspace)
-        self.mcp = MCPClient(workspace)
+        self.mcp = mcp_client.connect(workspace)
+        # 未显式 close 时（如被缓存池淘汰），在实例被回收或进程退出时释放资源
+        self._finalizer = weakref.finalize(self, _release, self.memory, self.mcp)
+        self._loggers: "OrderedDict[str, EventLogger]" = OrderedDict()
+        # 多个会话/请求线程共享同一个 Orchestrator，查找、插入与淘汰须互斥
+        self._loggers_lock = threading.Lock()
+        self._tools_cache: Optional[Tuple[List[str], FrozenSet[str], float]] = None
 
-    def plan(self, user_input: str) -> PlanResult:
+    def close(self) -> None:
+        """落盘未保存的记忆并关闭 MCP 连接；只执行一次，服务关闭时调用。"""
+        self._finalizer()
+
+    def _logger(self, trace_id: str) -> EventLogger:
+        """同一 trace 的 plan/execute 复用一个日志器。"""
+        with self._loggers_lock:
+            logger = self._loggers.get(trace_id)
+            if logger is None:
+                logger = self._loggers[trace_id] = EventLogger(self.workspace, trace_id)
+                while len(self._loggers) > MAX_PENDING_LOGGERS:
+                    self._loggers.popitem(last=False)
+            else:
+                self._loggers.move_to_end(trace_id)
+            return logger
+
+    def _cached_tools(self) -> Tuple[List[str], FrozenSet[str], float]:
+        now = time.monotonic()
+        if self._tools_cache and now - self._tools_cache[2] < TOOLS_CACHE_TTL:
+            return self._tools_cache
+        tools = self.mcp.list_tools()
+        self._tools_cache = (tools, frozenset(tools), now)
+        return self._tools_cache
+
+    def list_tools(self) -> List[str]:
+        """已注册的工具名（带缓存）；服务启动时调用可预热缓存。"""
+        return self._cached_tools()[0]
+
+    def _tool_set(self) -> FrozenSet[str]:
+        """已注册工具名的集合，供 validate_plan 直接查找。"""
+        return self._cached_tools()[1]
+
+    def invalidate_tools(self) -> None:
+        """丢弃缓存的工具列表，下次校验时重新向 MCP 查询。"""
+        self._tools_cache = None
+
+    def _begin_plan(self, user_input: str) -> Tuple[str, EventLogger]:
         trace_id = new_trace_id()
-        logger = EventLogger(self.workspace, trace_id)
+        logger = self._logger(trace_id)
         logger.log("RUN_START", {"workspace": self.workspace})
         logger.log("USER_INPUT", {"text": user_input})
-        logger.log("MEMORY_LOADED", {"persistent": self.memory.persist.__dict__})
+        persist = self.memory.persist
+        logger.log(
+            "MEMORY_LOADED",
+            {
+                "recent_ops_count": len(persist.recent_ops),
+                "workspaces": len(persist.common_workspaces),
+            },
+        )
+        return trace_id, logger
 
-        plan_result = self.planner.plan(user_input, use_llm=self.use_llm)
+    def _finish_plan(
+        self, plan_result: PlanResult, user_input: str, trace_id: str, logger: EventLogger
+    ) -> PlanResult:
         plan_result.trace_id = trace_id
+        if plan_result.cache_hit:
+            logger.log("PLAN_CACHE_HIT", {"text": user_input})
         if plan_result.plan:
             # 更新会话记忆
-            self.memory.session.last_plan = plan_result.plan.model_dump()
+            plan_dump = plan_result.plan.model_dump()
+            self.memory.session.last_plan = plan_dump
             for step in plan_result.plan.steps:
-                if step.tool in {"git_switch", "git_create_branch", "git_delete_branch"}:
+                if step.tool in _BRANCH_TOOLS:
                     branch = step.args.get("branch") or step.args.get("name")
                     if isinstance(branch, str):
                         self.memory.session.recent_branch = branch
-            errors = validate_plan(plan_result.plan, self.mcp.list_tools())
+            errors = validate_plan(plan_result.plan, self._tool_set())
             plan_result.errors.extend(errors)
-            logger.log("PLAN_GENERATED", plan_result.plan.model_dump())
+            logger.log("PLAN_GENERATED", plan_dump)
             logger.log("PLAN_VALIDATED", {"errors": errors})
         else:
             logger.log("PLAN_GENERATED", {"error": plan_result.errors})
         return plan_result
 
+    def plan(self, user_input: str) -> PlanResult:
+        trace_id, logger = self._begin_plan(user_input)
+        plan_result = self.planner.plan(user_input, use_llm=self.use_llm)
+        return self._finish_plan(plan_result, user_input, trace_id, logger)
+
+    def plan_stream(self, user_input: str) -> PlanStream:
+        """流式版 plan：边接收边展示 LLM 输出，首个片段到达即可渲染。"""
+        return PlanStream(self._plan_stream(user_input))
+
+    def _plan_stream(self, user_input: str) -> Generator[str, None, PlanResult]:
+        trace_id, logger = self._begin_plan(user_input)
+        plan_result = yield from self.planner.plan_stream(user_input, use_llm=self.use_llm)
+        return self._finish_plan(plan_result, user_input, trace_id, logger)
+
+    async def aplan(self, user_input: str) -> PlanResult:
+        """异步版 plan：等待 LLM 期间不阻塞事件循环，可与其他规划并发。"""
+        trace_id, logger = self._begin_plan(user_input)
+        plan_result = await self.planner.aplan(user_input, use_llm=self.use_llm)
+        return self._finish_plan(plan_result, user_input, trace_id, logger)
+
     def execute(self, plan: Plan, trace_id: str, confirmed: bool = False) -> Dict[str, Any]:
-        logger = EventLogger(self.workspace, trace_id)
+        logger = self._logger(trace_id)
         results: List[Dict[str, Any]] = []
         apply_confirmation(plan, confirmed)
 
-        for step in plan.steps:
+        # 每步的事件攒一批写入，最后一批与 RUN_SUMMARY 合并
+        pending: List[Tuple[str, Dict[str, Any]]] = []
+        prefetched: Dict[int, Any] = {}
+        for idx, step in enumerate(plan.steps):
+            logger.log_batch(pending)
+            pending = []
             payload = {"tool": step.tool, "args": step.args, "dry_run": step.dry_run}
             if step.dry_run:
-                logger.log("STEP_DRYRUN", payload)
+                pending.append(("STEP_DRYRUN", payload))
             else:
-                logger.log("USER_CONFIRM", {"confirmed": True, "tool": step.tool})
+                pending.append(("USER_CONFIRM", {"confirmed": True, "tool": step.tool}))
             try:
-                resp = self.mcp.call_tool(step.tool, step.args | {"dry_run": step.dry_run})
+                if self.mcp.pipelined and idx not in prefetched and step.tool in _READ_ONLY_TOOLS:
+                    prefetched = self._prefetch_read_only(plan.steps, idx)
+                if idx in prefetched:
+                    resp = prefetched.pop(idx)
+                    if isinstance(resp, Exception):
+                        raise resp
+                else:
+                    resp = self.mcp.call_tool(step.tool, {**step.args, "dry_run": step.dry_run})
                 results.append({"tool": step.tool, "ok": True, "result": resp})
-                logger.log("STEP_EXECUTED", {"tool": step.tool, "result": resp})
-                if step.tool in {"file_write", "file_patch", "file_read"}:
+                pending.append(("STEP_EXECUTED", {"tool": step.tool, "result": resp}))
+                if step.tool in _FILE_TOOLS:
                     path = step.args.get("path")
                     if isinstance(path, str):
                         self.memory.session.recent_files.append(path)
             except Exception as exc:
                 results.append({"tool": step.tool, "ok": False, "error": str(exc)})
-                logger.log("STEP_REJECTED", {"tool": step.tool, "error": str(exc)})
+                pending.append(("STEP_REJECTED", {"tool": step.tool, "error": str(exc)}))
                 break
 
         summary = self._summarize_results(results)
         write_run_report(self.workspace, trace_id, summary, results)
         self.memory.record_op(summary)
-        logger.log("RUN_SUMMARY", {"summary": summary})
+        pending.append(("RUN_SUMMARY", {"summary": summary}))
+        logger.log_batch(pending)
+        # 执行结束后调用方（UI 日志面板等）会马上读取日志
+        logger.flush()
+        with self._loggers_lock:
+            self._loggers.pop(trace_id, None)
         return {
             "trace_id": trace_id,
             "summary": summary,
             "results": results,
         }
 
+    def _prefetch_read_only(self, steps: List[Step], start: int) -> Dict[int, Any]:
+        """从 start 起连续的只读步骤一次性流水线发送，返回 {步骤下标: 结果或异常}。"""
+        run: List[int] = []
+        for idx in range(start, min(len(steps), start + MAX_PIPELINED_CALLS)):
+            if steps[idx].tool not in _READ_ONLY_TOOLS:
+                break
+            run.append(idx)
+        if len(run) < 2:
+            return {}
+        calls = [(steps[i].tool, {**steps[i].args, "dry_run": steps[i].dry_run}) for i in run]
+        return dict(zip(run, self.mcp.call_tools(calls)))
+
     def _summarize_results(self, results: List[Dict[str, Any]]) -> str:
         if not results:
             return "未执行任何步骤。"
@@ -1,14 +1,123 @@
 from __future__ import annotations
 
-import json
+import hashlib
 import re
+import threading
+import unicodedata
+from collections import OrderedDict
 from dataclasses import replace
-from typing import Dict, List, Optional
+from typing import Dict, Generator, List, Optional, Set, Tuple
 
 from gsa.agent.schema import Plan, PlanResult, Step
 from gsa.llm.llm_client import LLMClient, LLMKeyMissing, load_config
 from gsa.llm.prompts import PLANNER_SYSTEM_PROMPT
-from gsa.safety.risk import assess_risk
+from gsa.safety.risk import STATIC_RISK, assess_risk
+
+try:
+    import ahocorasick  # type: ignore
+except ImportError:  # 可选依赖，未安装时退回正则扫描
+    ahocorasick = None
+
+
+# 触发词表：(分组名, 模式, 命中后记录的触发名)。
+# 纯字面量分组优先交给 Aho-Corasick 自动机一次扫描；未安装 pyahocorasick 时，
+# 所有分组合并为一个零宽前瞻交替式。交替式里同一起点上较长的词排在前面，
+# 并带上被它遮住的前缀词的触发名（如“切换分支”同时记为 switch 与 switch_word）。
+_TRIGGERS = (
+    ("switch_branch", r"切换分支", ("switch", "switch_word")),
+    ("switch_word", r"切换", ("switch_word",)),
+    ("switch", r"checkout|switch", ("switch",)),
+    ("log_commit", r"提交历史|提交记录", ("log", "commit")),
+    ("commit", r"提交|commit", ("commit",)),
+    ("log", r"日志|log|历史|最近提交", ("log",)),
+    ("status", r"状态|status", ("status",)),
+    ("diff", r"差异|diff", ("diff",)),
+    ("create_branch", r"创建分支|新建分支", ("create_branch",)),
+    ("delete_branch", r"删除分支", ("delete_branch",)),
+    ("branch", r"分支", ("branch",)),
+    ("init_build", r"建立仓库", ("init", "build")),
+    ("init", r"初始化仓库|创建仓库", ("init",)),
+    ("init_git", r"(?i:初始化\s*git|git\s*repo|git\s*init)", ("init",)),
+    ("build", r"构建|建立", ("build",)),
+    ("add", r"暂存|add", ("add",)),
+    ("all", r"全部|所有", ("all",)),
+    ("index_search", r"搜索", ("index", "search")),
+    ("index_summary", r"总结", ("index", "summary")),
+    ("index_organize", r"整理建议", ("index", "organize")),
+    ("index", r"索引", ("index",)),
+    ("summary", r"概览", ("summary",)),
+)
+_TRIGGER_NAMES = {name: frozenset(hits) for name, _, hits in _TRIGGERS}
+
+
+def _alternatives(pat: str) -> List[str]:
+    return pat.removeprefix("(?i:").removesuffix(")").split("|")
+
+
+def _is_literal(pat: str) -> bool:
+    return all(re.escape(alt) == alt for alt in _alternatives(pat))
+
+
+def _first_chars(patterns: List[str]) -> str:
+    """各模式可能的首字符，拼成可直接放进字符类的字符串。"""
+    chars: Set[str] = set()
+    for pat in patterns:
+        ignore_case = pat.startswith("(?i:")
+        for alt in _alternatives(pat):
+            chars.add(alt[0])
+            if ignore_case:
+                chars.update({alt[0].lower(), alt[0].upper()})
+    return re.escape("".join(sorted(chars)))
+
+
+# 先用首字符集合跳过不可能命中的位置，再在前瞻中尝试各分组
+_DISPATCH = re.compile(
+    f"(?=[{_first_chars([pat for _, pat, _ in _TRIGGERS])}])(?="
+    + "|".join(f"(?P<{name}>{pat})" for name, pat, _ in _TRIGGERS)
+    + ")"
+)
+
+
+def _build_automaton():
+    """把区分大小写的字面量分组放进 Aho-Corasick；其余分组返回为一个正则。"""
+    automaton = ahocorasick.Automaton()
+    fuzzy: List[Tuple[str, str]] = []
+    for name, pat, _ in _TRIGGERS:
+        if pat.startswith("(?i:") or not _is_literal(pat):
+            fuzzy.append((name, pat))
+            continue
+        for word in _alternatives(pat):
+            automaton.add_word(word, _TRIGGER_NAMES[name])
+    automaton.make_automaton()
+    # 剩余分组同样按首字符预筛，regex 引擎可以快速跳过其余位置
+    first = _first_chars([pat for _, pat in fuzzy])
+    body = "|".join(f"(?P<{name}>{pat})" for name, pat in fuzzy)
+    return automaton, re.compile(f"(?=[{first}])(?:{body})")
+
+
+if ahocorasick is not None:
+    _AUTOMATON, _FUZZY = _build_automaton()
+else:
+    _AUTOMATON, _FUZZY = None, None
+
+# 需要捕获参数的提取正则
+_RE_COMMIT_MSG = re.compile(r"提交[:：]\s*(.+)")
+_RE_SWITCH_NAME = re.compile(r"切换分支[:：]?\s*(\S+)")
+_RE_BRANCH_NAME = re.compile(r"分支[:：]?\s*(\S+)")
+_RE_DELETE_NAME = re.compile(r"删除分支[:：]?\s*(\S+)")
+
+
+def _scan_triggers(text: str) -> Set[str]:
+    hits: Set[str] = set()
+    if _AUTOMATON is None:
+        for m in _DISPATCH.finditer(text):
+            hits |= _TRIGGER_NAMES[m.lastgroup]
+        return hits
+    for _, names in _AUTOMATON.iter(text):
+        hits |= names
+    for m in _FUZZY.finditer(text):
+        hits |= _TRIGGER_NAMES[m.lastgroup]
+    return hits
 
 
 class RulePlanner:
@@ -27,7 +136,7 @@ class RulePlanner:
             questions.append("检测到危险指令（reset --hard/clean -fd/force push），已被策略禁止。请改用更安全方案。其余安全步骤会继续规划。")
 
         def add_step(tool: str, args: Dict[str, object], dry_run: bool = True) -> None:
-            level, reason = assess_risk(tool, args)
+            level, reason = STATIC_RISK.get(tool) or assess_risk(tool, args)
             nonlocal needs_confirmation
             if level in {"medium", "high"}:
                 needs_confirmation = True
@@ -41,67 +150,69 @@ class RulePlanner:
                 )
             )
 
+        hits = _scan_triggers(text)
+
         # 只读类
-        wants_log = bool(re.search(r"日志|log|历史|最近提交|提交历史|提交记录", text))
-        if re.search(r"状态|status", text):
+        wants_log = "log" in hits
+        if "status" in hits:
             add_step("git_status", {}, dry_run=True)
         if wants_log:
             add_step("git_log", {"n": 10}, dry_run=True)
-        if re.search(r"差异|diff", text):
+        if "diff" in hits:
             add_step("git_diff", {"staged": False}, dry_run=True)
-        if re.search(r"分支列表|分支", text) and "切换" not in text:
+        if "branch" in hits and "switch_word" not in hits:
             add_step("git_branch_list", {}, dry_run=True)
 
         # 写操作
-        if re.search(r"初始化仓库|创建仓库|建立仓库|初始化\\s*git|git\\s*repo|git\\s*init", text, re.IGNORECASE):
+        if "init" in hits:
             add_step("git_init", {}, dry_run=True)
 
-        commit_trigger = bool(re.search(r"(提交(代码|改动|修复|到仓库)?|commit)", text))
-        commit_intent = commit_trigger and not wants_log and not re.search(r"提交历史|提交日志|提交记录|历史提交|最近提交", text)
+        # “提交历史/最近提交”等说法都会命中 log，因此 log 命中即视为查询而非提交
+        commit_intent = "commit" in hits and not wants_log
         if commit_intent:
-            msg_match = re.search(r"提交[:：]\s*(.+)", text)
+            msg_match = _RE_COMMIT_MSG.search(text)
             if not msg_match:
                 questions.append("提交信息是什么？例如：提交: 修复登录按钮")
             else:
                 add_step("git_commit", {"message": msg_match.group(1).strip()}, dry_run=True)
 
-        if re.search(r"暂存|add", text):
+        if "add" in hits:
             paths = ["."]
-            if re.search(r"全部|所有", text):
+            if "all" in hits:
                 add_step("git_add", {"paths": paths, "allow_all": True}, dry_run=True)
             else:
                 questions.append("要暂存哪些文件？请提供路径")
 
-        if re.search(r"切换分支|checkout|switch", text):
-            m = re.search(r"切换分支[:：]?\s*(\S+)", text)
+        if "switch" in hits:
+            m = _RE_SWITCH_NAME.search(text)
             if not m:
                 questions.append("要切换到哪个分支？")
             else:
                 add_step("git_switch", {"branch": m.group(1).strip(), "create": False}, dry_run=True)
 
-        if re.search(r"创建分支|新建分支", text):
-            m = re.search(r"分支[:：]?\s*(\S+)", text)
+        if "create_branch" in hits:
+            m = _RE_BRANCH_NAME.search(text)
             if not m:
                 questions.append("新分支名称是什么？")
             else:
                 add_step("git_create_branch", {"name": m.group(1).strip(), "from_ref": "HEAD"}, dry_run=True)
 
-        if re.search(r"删除分支", text):
-            m = re.search(r"删除分支[:：]?\s*(\S+)", text)
+        if "delete_branch" in hits:
+            m = _RE_DELETE_NAME.search(text)
             if not m:
                 questions.append("要删除哪个分支？")
             else:
                 add_step("git_delete_branch", {"name": m.group(1).strip(), "force": False}, dry_run=True)
 
-        if re.search(r"索引|搜索|总结|整理建议", text):
+        if "index" in hits:
             add_step("index_status", {}, dry_run=True)
-            if re.search(r"构建|建立", text):
+            if "build" in hits:
                 add_step("index_build", {"include_globs": ["**/*"], "exclude_globs": []}, dry_run=True)
-            if re.search(r"搜索", text):
+            if "search" in hits:
                 add_step("index_search", {"query": "项目概览", "top_k": 5}, dry_run=True)
-            if re.search(r"总结|概览", text):
+            if "summary" in hits:
                 add_step("repo_summarize", {}, dry_run=True)
-            if re.search(r"整理建议", text):
+            if "organize" in hits:
                 add_step("organize_suggestions", {}, dry_run=True)
 
         if not steps and not questions:
@@ -125,6 +236,12 @@ class Planner:
         self._config = load_config(workspace)
         self._model_override: Optional[str] = None
         self._base_url_override: Optional[str] = None
+        # 按 (model, base_url) 复用客户端，避免每次规划都重建 SDK 客户端与连接池
+        self._client_cache: Dict[Tuple[Optional[str], Optional[str]], LLMClient] = {}
+        # LLM 规划结果的 LRU 缓存：相同输入（空白/全角差异归一后）直接复用已解析的计划
+        self._plan_cache: "OrderedDict[str, Plan]" = OrderedDict()
+        # 多个会话/请求线程共享同一个 Planner，查找、插入与淘汰须互斥
+        self._plan_cache_lock = threading.Lock()
 
     def set_model(self, model: Optional[str]) -> None:
         self._model_override = model
@@ -132,43 +249,134 @@ class Planner:
     def set_base_url(self, base_url: Optional[str]) -> None:
         self._base_url_override = base_url
 
+    def asession(self):
+        """批量并发 aplan 时共用一个 HTTP 连接池，见 LLMClient.asession。"""
+        return self._get_llm_client().asession()
+
     def _get_llm_client(self) -> LLMClient:
+        key = (self._model_override, self._base_url_override)
+        client = self._client_cache.get(key)
+        if client is not None:
+            return client
         cfg = self._config
         if self._model_override:
             cfg = replace(self._config, model=self._model_override)
         if self._base_url_override:
             cfg = replace(cfg, base_url=self._base_url_override)
-        return LLMClient(cfg)
+        client = self._client_cache[key] = LLMClient(cfg)
+        return client
 
-    def plan(self, user_input: str, use_llm: bool = True) -> PlanResult:
-        if not use_llm:
-            return PlanResult(plan=self.rule_planner.plan(user_input))
+    def _plan_cache_key(self, user_input: str) -> str:
+        # 只归一化空白与全角字符，不改大小写/标点：分支名、提交信息对它们敏感
+        text = " ".join(unicodedata.normalize("NFKC", user_input).split())
+        model = self._model_override or self._config.model
+        base_url = self._base_url_override or self._config.base_url
+        raw = f"{model}\n{base_url}\n{text}"
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _remember_plan(self, key: str, plan: Plan) -> None:
+        max_size = self._config.plan_cache_size
+        if max_size <= 0:
+            return
+        # 存副本：执行阶段会原地修改 step.dry_run
+        stored = plan.model_copy(deep=True)
+        with self._plan_cache_lock:
+            self._plan_cache[key] = stored
+            self._plan_cache.move_to_end(key)
+            while len(self._plan_cache) > max_size:
+                self._plan_cache.popitem(last=False)
 
-        messages = [
+    def _fallback_plan(self, user_input: str) -> Plan:
+        """LLM 不可用时的规则计划；全是低风险步骤时不再追问。"""
+        plan = self.rule_planner.plan(user_input)
+        if plan.steps and all(s.safety_level == "low" for s in plan.steps):
+            plan.questions = []
+        return plan
+
+    def _cached_result(self, user_input: str) -> Tuple[str, Optional[PlanResult]]:
+        cache_key = self._plan_cache_key(user_input)
+        with self._plan_cache_lock:
+            cached = self._plan_cache.get(cache_key)
+            if cached is None:
+                return cache_key, None
+            self._plan_cache.move_to_end(cache_key)
+        return cache_key, PlanResult(plan=cached.model_copy(deep=True), cache_hit=True)
+
+    @staticmethod
+    def _messages(user_input: str) -> List[Dict[str, str]]:
+        return [
             {"role": "system", "content": PLANNER_SYSTEM_PROMPT},
             {"role": "user", "content": user_input},
         ]
+
+    def _error_result(self, user_input: str, exc: Exception) -> PlanResult:
+        if isinstance(exc, LLMKeyMissing):
+            return PlanResult(errors=[str(exc)], plan=self._fallback_plan(user_input))
+        msg = str(exc)
+        name = exc.__class__.__name__
+        if (
+            name in {"APITimeoutError", "TimeoutError", "ReadTimeout", "ConnectTimeout"}
+            or "timed out" in msg
+            or "timeout" in msg
+            or "超时" in msg
+        ):
+            return PlanResult(errors=[f"LLM 调用超时：{exc}"], plan=self._fallback_plan(user_input))
+        return PlanResult(errors=[f"LLM 调用失败：{exc}"], plan=None)
+
+    def _parse_result(self, user_input: str, cache_key: str, text: str) -> PlanResult:
+        # 明显不是 JSON 对象时直接回退，省掉一次注定失败的解析
+        if not text or text.lstrip()[:1] != "{":
+            return PlanResult(errors=["规划结果解析失败：LLM 未返回 JSON 对象"], plan=self.rule_planner.plan(user_input))
+        try:
+            plan = Plan.model_validate_json(text)
+        except Exception as exc:
+            return PlanResult(errors=[f"规划结果解析失败：{exc}"], plan=self.rule_planner.plan(user_input))
+        self._remember_plan(cache_key, plan)
+        return PlanResult(plan=plan)
+
+    def plan(self, user_input: str, use_llm: bool = True) -> PlanResult:
+        if not use_llm:
+            return PlanResult(plan=self.rule_planner.plan(user_input))
+
+        cache_key, hit = self._cached_result(user_input)
+        if hit is not None:
+            return hit
         try:
             client = self._get_llm_client()
-            text = client.chat_text(messages, temperature=0.2, max_tokens=2048)
-        except LLMKeyMissing as exc:
-            plan = self.rule_planner.plan(user_input)
-            if plan.steps and all(s.safety_level == "low" for s in plan.steps):
-                plan.questions = []
-            return PlanResult(errors=[str(exc)], plan=plan)
+            text = client.chat_text(self._messages(user_input), temperature=0.2, max_tokens=2048)
         except Exception as exc:
-            msg = str(exc)
-            name = exc.__class__.__name__
-            if name in {"APITimeoutError", "TimeoutError"} or "timed out" in msg or "timeout" in msg or "超时" in msg:
-                plan = self.rule_planner.plan(user_input)
-                if plan.steps and all(s.safety_level == "low" for s in plan.steps):
-                    plan.questions = []
-                return PlanResult(errors=[f"LLM 调用超时：{exc}"], plan=plan)
-            return PlanResult(errors=[f"LLM 调用失败：{exc}"], plan=None)
+            return self._error_result(user_input, exc)
+        return self._parse_result(user_input, cache_key, text)
 
+    async def aplan(self, user_input: str, use_llm: bool = True) -> PlanResult:
+        """异步版 plan：LLM 请求走 achat_text，多个规划可以并发等待。"""
+        if not use_llm:
+            return PlanResult(plan=self.rule_planner.plan(user_input))
+
+        cache_key, hit = self._cached_result(user_input)
+        if hit is not None:
+            return hit
         try:
-            data = json.loads(text)
-            plan = Plan.model_validate(data)
-            return PlanResult(plan=plan)
+            client = self._get_llm_client()
+            text = await client.achat_text(self._messages(user_input), temperature=0.2, max_tokens=2048)
         except Exception as exc:
-            return PlanResult(errors=[f"规划结果解析失败：{exc}"], plan=self.rule_planner.plan(user_input))
+            return self._error_result(user_input, exc)
+        return self._parse_result(user_input, cache_key, text)
+
+    def plan_stream(self, user_input: str, use_llm: bool = True) -> Generator[str, None, PlanResult]:
+        """流式版 plan：逐段产出 LLM 原始输出，生成器结束时返回 PlanResult。"""
+        if not use_llm:
+            return PlanResult(plan=self.rule_planner.plan(user_input))
+
+        cache_key, hit = self._cached_result(user_input)
+        if hit is not None:
+            return hit
+        parts: List[str] = []
+        try:
+            client = self._get_llm_client()
+            for chunk in client.chat_stream_batched(self._messages(user_input), temperature=0.2, max_tokens=2048):
+                parts.append(chunk)
+                yield chunk
+        except Exception as exc:
+            return self._error_result(user_input, exc)
+        return self._parse_result(user_input, cache_key, "".join(parts))
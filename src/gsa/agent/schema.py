@@ -34,3 +34,4 @@ class PlanResult(BaseModel):
     errors: List[str] = Field(default_factory=list)
     warnings: List[str] = Field(default_factory=list)
     trace_id: str = ""
+    cache_hit: bool = False
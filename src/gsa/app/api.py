@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from pydantic import BaseModel
 
+from gsa import jsonio
 from gsa.agent.orchestrator import Orchestrator
 from gsa.agent.schema import Plan
 
@@ -29,27 +31,40 @@ class IndexBuildRequest(BaseModel):
     dry_run: bool = True
 
 
-app = FastAPI(title="Git Safety Agent")
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    workspace = os.environ.get("GSA_WORKSPACE", os.getcwd())
+    orch = Orchestrator(workspace)
+    # 启动时预热工具列表，首个 /plan 不再等 MCP 往返
+    orch.list_tools()
+    app.state.orchestrator = orch
+    try:
+        yield
+    finally:
+        orch.close()
 
 
-@app.on_event("startup")
-def startup():
-    workspace = os.environ.get("GSA_WORKSPACE", os.getcwd())
-    app.state.orchestrator = Orchestrator(workspace)
+app = FastAPI(title="Git Safety Agent", lifespan=lifespan)
+
+
+def _json_response(content: bytes) -> Response:
+    return Response(content=content, media_type="application/json")
 
 
 @app.post("/plan")
-def plan(req: PlanRequest) -> Dict[str, Any]:
+def plan(req: PlanRequest) -> Response:
     orch: Orchestrator = app.state.orchestrator
     orch.use_llm = req.use_llm
     result = orch.plan(req.user_input)
-    return result.model_dump()
+    # 直接由 pydantic 序列化为 JSON，跳过 model_dump + jsonable_encoder 两次遍历
+    return _json_response(result.model_dump_json().encode("utf-8"))
 
 
 @app.post("/execute")
-def execute(req: ExecuteRequest) -> Dict[str, Any]:
+def execute(req: ExecuteRequest) -> Response:
     orch: Orchestrator = app.state.orchestrator
-    return orch.execute(req.plan, trace_id=req.trace_id, confirmed=req.confirmed)
+    result = orch.execute(req.plan, trace_id=req.trace_id, confirmed=req.confirmed)
+    return _json_response(jsonio.dumps(result))
 
 
 @app.post("/index/build")
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from gsa.agent.orchestrator import Orchestrator
+
+# 同时保留的工作区 Orchestrator 个数；超出后按最久未用淘汰
+MAX_ORCHESTRATORS = 4
+
+# 进程级单例：每个工作区只创建一个 Orchestrator，所有会话共享。
+# 放在独立模块里，streamlit 每次重跑 ui.py 脚本时不会被重置，也不受 st.cache_resource 清理影响。
+_ORCH: "OrderedDict[str, Orchestrator]" = OrderedDict()
+_ORCH_LOCK = threading.Lock()
+
+
+def get_orchestrator(workspace: str) -> Orchestrator:
+    # 延迟导入：规划器/MCP 客户端等依赖直到第一次真正需要时才加载
+    from gsa.agent.orchestrator import Orchestrator
+
+    evicted = []
+    with _ORCH_LOCK:
+        orch = _ORCH.get(workspace)
+        if orch is None:
+            orch = _ORCH[workspace] = Orchestrator(workspace)
+            while len(_ORCH) > MAX_ORCHESTRATORS:
+                evicted.append(_ORCH.popitem(last=False)[1])
+        else:
+            _ORCH.move_to_end(workspace)
+    for old in evicted:
+        # 其他会话可能仍在用它规划/执行，这里只落盘记忆；MCP 连接（远程模式下的子进程）
+        # 由 Orchestrator 的 finalizer 在最后一个引用释放后关闭
+        old.memory.flush()
+    return orch
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import dbm
+import hashlib
+import json
+import os
+import threading
+import zlib
+from typing import Any, Dict, Optional
+
+from gsa import jsonio
+
+try:
+    import lz4.frame  # type: ignore
+except ImportError:  # 可选依赖，未安装时使用 zlib 压缩
+    lz4 = None
+
+# 结果依赖索引内容的工具；索引重建后缓存自动失效
+CACHEABLE_TOOLS = frozenset({"repo_summarize", "organize_suggestions", "index_qa"})
+
+_VERSION_KEY = b"__index_version__"
+_CODEC_ZLIB = b"z"
+_CODEC_LZ4 = b"4"
+_DB_LOCK = threading.Lock()
+
+
+def _compress(data: bytes) -> bytes:
+    if lz4 is not None:
+        return _CODEC_LZ4 + lz4.frame.compress(data)
+    return _CODEC_ZLIB + zlib.compress(data)
+
+
+def _decompress(blob: bytes) -> bytes:
+    codec, body = blob[:1], blob[1:]
+    if codec == _CODEC_LZ4:
+        if lz4 is None:
+            raise ValueError("缓存由 lz4 压缩，但未安装 lz4")
+        return lz4.frame.decompress(body)
+    return zlib.decompress(body)
+
+
+def _index_version(workspace: str) -> Optional[int]:
+    try:
+        return os.stat(os.path.join(workspace, ".gsa", "index_meta.json")).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _cache_key(tool: str, args: Dict[str, Any], version: int) -> bytes:
+    raw = json.dumps([tool, args, version], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+
+
+def cached_call_tool(orch: Any, tool: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    """带持久化缓存的 MCP 调用（.gsa/toolcache.db），仅缓存 LLM 成功生成的结果。"""
+    version = _index_version(orch.workspace) if tool in CACHEABLE_TOOLS else None
+    if version is None:
+        return orch.mcp.call_tool(tool, args)
+
+    path = os.path.join(orch.workspace, ".gsa", "toolcache.db")
+    key = _cache_key(tool, args, version)
+    try:
+        with _DB_LOCK, dbm.open(path, "c") as db:
+            blob = db.get(key)
+        if blob is not None:
+            return jsonio.loads(_decompress(blob))
+    except Exception:
+        # 缓存损坏或不可用时直接走工具调用
+        pass
+
+    result = orch.mcp.call_tool(tool, args)
+    if result.get("ok", True) and not result.get("fallback"):
+        try:
+            with _DB_LOCK, dbm.open(path, "c") as db:
+                marker = str(version).encode()
+                if db.get(_VERSION_KEY) != marker:
+                    # 索引已重建：旧版本的条目不会再命中，整体清掉
+                    for old in list(db.keys()):
+                        del db[old]
+                    db[_VERSION_KEY] = marker
+                db[key] = _compress(jsonio.dumps(result))
+        except Exception:
+            pass
+    return result
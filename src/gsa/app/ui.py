@@ -3,46 +3,54 @@ from __future__ import annotations
 import os
 import re
 import uuid
-from typing import Any, Dict, List, Optional
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
 import html
 
 import streamlit as st
 from streamlit.runtime.scriptrunner_utils.script_run_context import get_script_run_ctx
 
-from gsa.agent.clarifier import clarify_questions
-from gsa.agent.orchestrator import Orchestrator
-from gsa.llm.llm_client import load_config
+from gsa.app.shared import get_orchestrator
+from gsa.app.toolcache import cached_call_tool
+
+if TYPE_CHECKING:
+    from gsa.agent.orchestrator import Orchestrator
 
 
 def _default_workspace() -> str:
     return os.environ.get("GSA_WORKSPACE", os.getcwd())
 
 
-def _cache_resource(func):
-    if get_script_run_ctx() is None:
+def _fragment(func):
+    # 局部重跑：片段内的交互只重跑该函数；无运行上下文或旧版 streamlit 时退化为普通函数
+    fragment = getattr(st, "fragment", None)
+    if fragment is None or get_script_run_ctx() is None:
         return func
-    return st.cache_resource(func)
+    return fragment(func)
 
 
-def _cache_data(func):
-    if get_script_run_ctx() is None:
-        return func
-    return st.cache_data(func)
+def _cache_data(func=None, **kwargs):
+    def wrap(f):
+        if get_script_run_ctx() is None:
+            return f
+        return st.cache_data(f, **kwargs)
+
+    return wrap(func) if func is not None else wrap
 
 
-@_cache_resource
-def get_orchestrator(workspace: str) -> Orchestrator:
-    return Orchestrator(workspace)
+# 侧边栏目录树深度与 git 历史默认提交数
+TREE_DEPTH = 3
+DEFAULT_GRAPH_COMMITS = 30
 
 
-@_cache_data
+@_cache_data(ttl=60, max_entries=32)
 def get_tree_items(workspace: str, max_depth: int) -> List[str]:
     orch = get_orchestrator(workspace)
     data = orch.mcp.call_tool("file_list", {"dir": ".", "max_depth": max_depth})
     return data.get("items", [])
 
 
-@_cache_data
+@_cache_data(ttl=30, max_entries=64)
 def get_git_graph(workspace: str, n: int, author: str, branch: str, path: str) -> str:
     orch = get_orchestrator(workspace)
     data = orch.mcp.call_tool(
@@ -57,52 +65,152 @@ def get_git_graph(workspace: str, n: int, author: str, branch: str, path: str) -
     return data.get("stdout", "")
 
 
-def build_tree(items: List[str]) -> Dict[str, Any]:
-    tree: Dict[str, Any] = {"__files__": []}
+@_cache_data(ttl=30, max_entries=8)
+def get_sidebar_data(workspace: str, max_depth: int, n: int) -> Tuple[List[str], str]:
+    """首次渲染侧边栏时把目录列表与默认 git 历史合成一批发给 MCP，只等一次往返。"""
+    orch = get_orchestrator(workspace)
+    listing, graph = orch.mcp.call_tools(
+        [
+            ("file_list", {"dir": ".", "max_depth": max_depth}),
+            ("git_log_graph", {"n": n, "author": None, "branch": None, "path": None}),
+        ]
+    )
+    if isinstance(listing, Exception):
+        raise listing
+    if isinstance(graph, Exception):
+        raise graph
+    return listing.get("items", []), graph.get("stdout", "")
+
+
+def _clear_caches(*funcs) -> None:
+    # 只清指定函数的缓存；st.cache_data.clear() 会连预览、日志、目录树展开结果一起清掉
+    for func in funcs:
+        clear = getattr(func, "clear", None)
+        if clear is not None:
+            clear()
+
+
+# (深度, 类型 "dir"/"file", 名称, 完整路径)
+TreeRow = Tuple[int, str, str, str]
+# 目录结构一次最多展示的行数
+TREE_WINDOW = 100
+
+
+def tree_rows(items: List[str]) -> List[TreeRow]:
+    """把 file_list 结果按目录树先序展开（子目录在前、文件在后，各自排序）。"""
+    # 按父目录分组：查某目录的子项只需一次字典访问
+    dirs_by_parent: Dict[str, set] = defaultdict(set)
+    files_by_parent: Dict[str, List[str]] = defaultdict(list)
+
+    def add_dir(dir_path: str) -> None:
+        # 逐级向上登记，遇到已登记的祖先即停
+        while dir_path and dir_path not in known_dirs:
+            known_dirs.add(dir_path)
+            parent, _, _ = dir_path.rpartition("/")
+            dirs_by_parent[parent].add(dir_path)
+            dir_path = parent
+
+    known_dirs: set = set()
     for item in items:
-        path = item.replace("./", "").strip()
-        if not path or path in {".", "./"}:
+        path = item.strip()
+        # file_list 只在开头带 "./"；只去前缀，不误伤 "dir./file" 这类路径
+        if path.startswith("./"):
+            path = path[2:]
+        if not path or path == ".":
             continue
         if path.endswith("/"):
-            parts = path.strip("/").split("/")
-            node = tree
-            for p in parts:
-                node = node.setdefault(p, {"__files__": []})
+            add_dir(path.strip("/"))
         else:
-            parts = path.split("/")
-            *dirs, fname = parts
-            node = tree
-            for d in dirs:
-                node = node.setdefault(d, {"__files__": []})
-            node.setdefault("__files__", []).append(fname)
-    return tree
-
-
-def render_tree(node: Dict[str, Any], base: str = "") -> None:
-    dirs = sorted([k for k in node.keys() if k != "__files__"])
-    files = sorted(node.get("__files__", []))
-    for d in dirs:
-        with st.expander(f"📁 {d}", expanded=False):
-            render_tree(node[d], os.path.join(base, d) if base else d)
-    for f in files:
-        full_path = os.path.join(base, f) if base else f
-        if st.button(f"📄 {f}", key=f"file_{full_path}"):
-            st.session_state["preview_file"] = full_path
+            dir_path, _, _ = path.rpartition("/")
+            add_dir(dir_path)
+            files_by_parent[dir_path].append(path)
+
+    rows: List[TreeRow] = []
+    # 显式栈先序遍历；同一父目录下按完整路径排序即按名称排序
+    stack: List[Tuple[str, str, int]] = [("files", "", 0)]
+    stack.extend(("dir", d, 0) for d in sorted(dirs_by_parent.get("", ()), reverse=True))
+    while stack:
+        kind, path, depth = stack.pop()
+        if kind == "files":
+            rows.extend((depth, "file", f.rpartition("/")[2], f) for f in sorted(files_by_parent.get(path, ())))
+            continue
+        rows.append((depth, "dir", path.rpartition("/")[2], path))
+        # 子目录全部输出后才轮到本目录的文件
+        stack.append(("files", path, depth + 1))
+        stack.extend(("dir", d, depth + 1) for d in sorted(dirs_by_parent.get(path, ()), reverse=True))
+    return rows
 
 
-def append_message(role: str, content: str, fmt: str = "text") -> None:
-    st.session_state.setdefault("messages", []).append({"role": role, "content": content, "format": fmt})
+@_cache_data(ttl=60, max_entries=32)
+def _cached_tree_rows(workspace: str, query: str, fingerprint: int, _items: List[str]) -> List[TreeRow]:
+    # streamlit 不对下划线参数求哈希：对上万条路径逐个哈希比过滤+建树还慢，
+    # 这里用 fingerprint（items 的 Python 哈希）代表内容，同一查询重跑时直接命中
+    items = [i for i in _items if query in i] if query else _items
+    return tree_rows(items)
 
 
-def _clear_status_messages() -> None:
-    msgs = st.session_state.get("messages", [])
-    if not msgs:
-        return
-    st.session_state["messages"] = [m for m in msgs if m.get("format") != "status"]
+def _on_pick_file() -> None:
+    st.session_state["preview_file"] = st.session_state.get("file_picker") or ""
+    _request_app_rerun()
+
+
+def _request_app_rerun() -> None:
+    # 片段内的改动需要主区域（文件预览）一起刷新时，由片段结尾触发整页重跑
+    st.session_state["rerun_app"] = True
+
+
+def _tail_lines(path: str, n: int = 50, block: int = 8192) -> List[str]:
+    """从文件末尾按块倒读，只取最后 n 行。"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        while pos > 0 and data.count(b"\n") <= n:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = data.splitlines()
+    if pos > 0:
+        # 第一行可能只读到一半
+        lines = lines[1:]
+    return [line.decode("utf-8", errors="replace") for line in lines[-n:]]
+
+
+@_cache_data(ttl=30, max_entries=64)
+def _cached_file_read(workspace: str, path: str, mtime_ns: int) -> Dict[str, Any]:
+    # mtime 参与缓存键：文件被修改后自动失效
+    return get_orchestrator(workspace).mcp.call_tool("file_read", {"path": path})
+
+
+@_cache_data(ttl=2, max_entries=8)
+def _cached_log_tail(path: str, mtime_ns: int) -> List[str]:
+    return _tail_lines(path, 50)
+
+
+# 每次重跑默认只渲染最近的若干条消息；会话最多保留的消息数
+MAX_VISIBLE_MESSAGES = 20
+MAX_MESSAGES = 500
+
+
+def append_message(role: str, content: str, fmt: str = "text") -> None:
+    msgs = st.session_state.setdefault("messages", [])
+    msgs.append({"role": role, "content": content, "format": fmt})
+    overflow = len(msgs) - MAX_MESSAGES
+    if overflow > 0:
+        del msgs[:overflow]
+        if "msg_render_start" in st.session_state:
+            st.session_state["msg_render_start"] = max(0, st.session_state["msg_render_start"] - overflow)
 
 
 def render_messages() -> None:
-    for msg in st.session_state.get("messages", []):
+    msgs = st.session_state.get("messages", [])
+    start = st.session_state.get("msg_render_start", max(0, len(msgs) - MAX_VISIBLE_MESSAGES))
+    start = min(start, len(msgs))
+    if start > 0 and st.button(f"显示更早记录（还有 {start} 条）"):
+        start = max(0, start - MAX_VISIBLE_MESSAGES)
+        st.session_state["msg_render_start"] = start
+    for msg in msgs[start:]:
         with st.chat_message(msg["role"]):
             if msg.get("format") == "markdown":
                 st.markdown(msg["content"], unsafe_allow_html=True)
@@ -110,6 +218,14 @@ def render_messages() -> None:
                 st.write(msg["content"])
 
 
+_ERR_RE = re.compile(r"(?P<key>BIGMODEL_API_KEY)|(?P<timeout>timed out|超时)|(?P<llm>LLM 调用失败)")
+_ERR_MESSAGES = (
+    ("key", "未检测到 API Key。请配置 BIGMODEL_API_KEY（环境变量或 config.yaml）。"),
+    ("timeout", "LLM 调用超时，已自动降级为规则规划。请检查网络与 API Key。"),
+    ("llm", "LLM 调用失败，错误信息如下：\n{text}"),
+)
+
+
 def _friendly_error(errors: List[str], has_plan: bool) -> Optional[str]:
     if not errors:
         return None
@@ -118,12 +234,11 @@ def _friendly_error(errors: List[str], has_plan: bool) -> Optional[str]:
         if not errors:
             return None
     text = "\n".join(errors)
-    if "BIGMODEL_API_KEY" in text:
-        return "未检测到 API Key。请配置 BIGMODEL_API_KEY（环境变量或 config.yaml）。"
-    if "timed out" in text or "超时" in text:
-        return "LLM 调用超时，已自动降级为规则规划。请检查网络与 API Key。"
-    if "LLM 调用失败" in text:
-        return "LLM 调用失败，错误信息如下：\n" + text
+    # 一次扫描收集所有命中的类别，再按表中顺序取优先级最高的提示
+    hits = {m.lastgroup for m in _ERR_RE.finditer(text)}
+    for name, template in _ERR_MESSAGES:
+        if name in hits:
+            return template.format(text=text)
     return "规划校验出现问题：\n" + text
 
 
@@ -156,14 +271,15 @@ def _render_long_text(title: str, text: str, as_code: bool = False) -> None:
             st.write(text)
 
 
+# 中文词两侧通常紧挨着其他汉字，\b 在这里从不成立，所以只给英文词加边界；
+# 单字“类”会命中“分类”“这类”等普通用语，只认“类名”“这个类”等明确指代代码的说法；
+# 代码特征只在行首（允许缩进）匹配，避免把英文句子里的 "from " 当成代码
+_CODE_KW_RE = re.compile(r"代码|函数|类名|类定义|(?:这个|那个|哪个)类|\bcode\b")
+_CODE_SIG_RE = re.compile(r"^[ \t]*(?:def |class |import |from |if __name__|@)", re.M)
+
+
 def _is_code_like(text: str, query: str) -> bool:
-    if "```" in text:
-        return True
-    if re.search(r"\b(代码|code|函数|类)\b", query):
-        return True
-    if re.search(r"\b(def |class |import |from |if __name__|@)\b", text):
-        return True
-    return False
+    return "```" in text or bool(_CODE_KW_RE.search(query)) or bool(_CODE_SIG_RE.search(text))
 
 
 def _escape_html(text: str) -> str:
@@ -204,12 +320,35 @@ def _filter_plan_for_mode(plan, mode: str):
     return filtered, removed
 
 
+def _fenced_json(chunks: Iterable[str]) -> Iterator[str]:
+    # 规划输出是 JSON：包进代码块，流式渲染时不按 markdown 折行
+    started = False
+    for chunk in chunks:
+        if not started:
+            started = True
+            yield "```json\n"
+        yield chunk
+    if started:
+        yield "\n```"
+
+
+def _stream_plan(orch: Orchestrator, text: str):
+    """边生成边展示 LLM 规划输出；结束后清掉临时气泡，结果照常写入对话记录。"""
+    stream = orch.plan_stream(text)
+    placeholder = st.empty()
+    with placeholder.container():
+        with st.chat_message("assistant"):
+            st.write_stream(_fenced_json(stream))
+    placeholder.empty()
+    return stream.result
+
+
 def _handle_chat_request(orch: Orchestrator, user_input: str, chat_mode: str) -> None:
     pending_questions = st.session_state.get("pending_questions")
     base_input = st.session_state.get("pending_base_input", "")
 
     if chat_mode == "索引问答":
-        res = orch.mcp.call_tool("index_qa", {"query": user_input, "top_k": 6})
+        res = cached_call_tool(orch, "index_qa", {"query": user_input, "top_k": 6})
         if not res.get("ok", True):
             if "索引不存在" in str(res.get("error")):
                 msg = (
@@ -237,12 +376,13 @@ def _handle_chat_request(orch: Orchestrator, user_input: str, chat_mode: str) ->
         st.session_state["pending_base_input"] = user_input
 
     orch.use_llm = True
-    result = orch.plan(combined)
+    result = _stream_plan(orch, combined)
     if result.plan:
         filtered, removed = _filter_plan_for_mode(result.plan, chat_mode)
         if removed:
             result.plan = filtered
     st.session_state["last_plan_result"] = result
+    st.session_state.pop("plan_json", None)
 
     msg = _friendly_error(result.errors, has_plan=bool(result.plan))
     if msg:
@@ -250,6 +390,8 @@ def _handle_chat_request(orch: Orchestrator, user_input: str, chat_mode: str) ->
 
     if result.plan:
         if result.plan.questions:
+            from gsa.agent.clarifier import clarify_questions
+
             qs = clarify_questions(result.plan.questions)
             msg2 = "我需要进一步澄清：\n" + qs
             append_message("assistant", msg2)
@@ -261,7 +403,7 @@ def _handle_chat_request(orch: Orchestrator, user_input: str, chat_mode: str) ->
 
 def _handle_quick_action(orch: Orchestrator, action: str) -> None:
     if action == "repo_summarize":
-        res = orch.mcp.call_tool("repo_summarize", {})
+        res = cached_call_tool(orch, "repo_summarize", {})
         if not res.get("ok", True) and "索引不存在" in str(res.get("error")):
             msg = (
                 "索引尚未构建。索引会把本地文件切片并建立向量检索，"
@@ -274,7 +416,7 @@ def _handle_quick_action(orch: Orchestrator, action: str) -> None:
         append_message("assistant", msg)
         return
     if action == "organize_suggestions":
-        res = orch.mcp.call_tool("organize_suggestions", {})
+        res = cached_call_tool(orch, "organize_suggestions", {})
         if not res.get("ok", True) and "索引不存在" in str(res.get("error")):
             msg = (
                 "索引尚未构建。索引会把本地文件切片并建立向量检索，"
@@ -296,6 +438,166 @@ def _handle_quick_action(orch: Orchestrator, action: str) -> None:
     append_message("assistant", msg)
 
 
+@_fragment
+def _render_exec_result(workspace: str) -> None:
+    exec_result = st.session_state.get("exec_result")
+    if not exec_result:
+        return
+    st.markdown('<div id="section-result"></div>', unsafe_allow_html=True)
+    st.subheader("执行结果")
+    st.info(exec_result.get("summary", ""))
+    st.caption("执行明细")
+    for item in exec_result.get("results", []):
+        tool = item.get("tool", "")
+        ok = item.get("ok", False)
+        st.write(f"- {tool}：{'成功' if ok else '失败'}")
+    with st.expander("错误摘要", expanded=False):
+        has_error = False
+        for item in exec_result.get("results", []):
+            tool = item.get("tool", "")
+            if not item.get("ok"):
+                st.markdown(f"**{tool}**")
+                st.write(item.get("error", "未知错误"))
+                has_error = True
+                continue
+            result = item.get("result", {})
+            stderr = result.get("stderr")
+            if stderr:
+                st.markdown(f"**{tool}**")
+                st.code(stderr, language="text")
+                has_error = True
+        if not has_error:
+            st.write("无错误。")
+    st.info(f"trace_id: {exec_result.get('trace_id')}")
+    log_path = os.path.join(workspace, ".gsa", "logs")
+    st.info(f"日志目录：{log_path}")
+    try:
+        files = sorted(os.listdir(log_path))
+        if files:
+            latest = os.path.join(log_path, files[-1])
+            lines = _cached_log_tail(latest, os.stat(latest).st_mtime_ns)
+            st.code("\n".join(lines), language="json")
+    except Exception:
+        pass
+
+    if st.session_state.get("need_index"):
+        st.subheader("索引提示")
+        st.info(st.session_state.get("need_index_msg", "需要先构建索引。"))
+        if st.button("构建索引"):
+            with st.spinner("正在构建索引..."):
+                res = get_orchestrator(workspace).mcp.call_tool(
+                    "index_build",
+                    {"include_globs": ["**/*"], "exclude_globs": [], "dry_run": False},
+                )
+            if res.get("ok", True):
+                msg = (
+                    f"索引已构建：文档 {res.get('docs')}，"
+                    f"切片 {res.get('chunks')}。请重新提问。"
+                )
+                st.session_state["need_index"] = False
+                st.session_state["need_index_msg"] = ""
+            else:
+                msg = res.get("error", "索引构建失败")
+            st.write(msg)
+            append_message("assistant", msg)
+
+
+@_fragment
+def _render_preview(workspace: str) -> None:
+    preview_enabled = st.session_state.get("preview_enabled", True)
+    st.markdown('<div id="section-preview"></div>', unsafe_allow_html=True)
+    preview_path = st.session_state.get("preview_file", "")
+    if preview_enabled and preview_path:
+        st.subheader("文件预览")
+        st.caption(f"预览：{preview_path}")
+        try:
+            mtime_ns = os.stat(os.path.join(workspace, preview_path)).st_mtime_ns
+        except OSError:
+            mtime_ns = 0
+        content = _cached_file_read(workspace, preview_path, mtime_ns)
+        if not content.get("ok", True):
+            st.error(content.get("error", "读取失败"))
+        else:
+            text = content.get("content", "")
+            if not text:
+                st.info("文件为空或无法显示（可能为二进制或内容过大）。")
+            else:
+                st.code(text, language="text")
+
+
+@_fragment
+def _render_tree_panel(workspace: str) -> None:
+    """目录结构面板；作为片段运行，搜索/翻页只重跑本面板。"""
+    if st.session_state.pop("rerun_app", False):
+        st.rerun()
+    query = st.text_input("快速搜索路径")
+    preview_enabled = st.checkbox("启用文件预览", value=True, on_change=_request_app_rerun)
+    st.session_state["preview_enabled"] = preview_enabled
+    if st.button("刷新目录"):
+        _clear_caches(get_tree_items, get_sidebar_data)
+    cached_graph = st.session_state.get("git_graph_cache")
+    if not cached_graph or cached_graph["workspace"] != workspace:
+        items, graph = get_sidebar_data(workspace, TREE_DEPTH, DEFAULT_GRAPH_COMMITS)
+        st.session_state["git_graph_cache"] = {"workspace": workspace, "graph": graph}
+    else:
+        items = get_tree_items(workspace, TREE_DEPTH)
+    rows = _cached_tree_rows(workspace, query, hash(tuple(items)), items)
+    # 目录结构只渲染一个窗口，整段文本作为单个组件下发
+    max_offset = max(len(rows) - TREE_WINDOW, 0)
+    if st.session_state.get("tree_offset", 0) > max_offset:
+        st.session_state["tree_offset"] = max_offset
+    if max_offset:
+        st.slider("起始行", 0, max_offset, key="tree_offset")
+    offset = st.session_state.get("tree_offset", 0)
+    st.code(
+        "\n".join(
+            "  " * depth + ("📁 " if kind == "dir" else "📄 ") + name
+            for depth, kind, name, _ in rows[offset : offset + TREE_WINDOW]
+        ),
+        language="text",
+    )
+    # 单个下拉框代替逐文件按钮，文件多时每次重跑只需下发一个组件
+    st.selectbox(
+        "文件",
+        [path for _, kind, _, path in rows if kind == "file"],
+        index=None,
+        key="file_picker",
+        placeholder="选择文件以预览",
+        format_func=lambda p: f"📄 {p}",
+        on_change=_on_pick_file,
+    )
+
+
+@_fragment
+def _render_git_history(workspace: str) -> None:
+    """Git 历史面板；作为片段运行，查询只重跑本面板。"""
+    # 过滤条件放进表单：只有点“查询/刷新历史”才调用 git log，输入过程中不会反复触发
+    with st.form("git_hist_form", border=False):
+        n = st.slider("提交数量", 5, 80, DEFAULT_GRAPH_COMMITS)
+        branch = st.text_input("分支过滤（可选）", value="")
+        author = st.text_input("作者过滤（可选）", value="")
+        path = st.text_input("文件路径过滤（可选）", value="")
+        col_h1, col_h2 = st.columns(2)
+        with col_h1:
+            query_hist = st.form_submit_button("查询", use_container_width=True)
+        with col_h2:
+            refresh_hist = st.form_submit_button("刷新历史", use_container_width=True)
+    if refresh_hist:
+        _clear_caches(get_git_graph, get_sidebar_data)
+    # 首次渲染时默认历史通常已随目录列表一起取回（见 get_sidebar_data）；
+    # 目录面板出错或尚未运行时缓存可能缺失，此时按当前条件现取
+    cached_graph = st.session_state.get("git_graph_cache")
+    if query_hist or refresh_hist or not cached_graph or cached_graph["workspace"] != workspace:
+        cached_graph = {
+            "workspace": workspace,
+            "graph": get_git_graph(workspace, n, author, branch, path),
+        }
+        st.session_state["git_graph_cache"] = cached_graph
+    # 内容原样交给 st.code；未变化的大段输出（≥ global.minCachedMessageSize）会由
+    # streamlit 的 ForwardMsg 缓存按内容哈希只下发引用，不必在这里再做哈希去重
+    st.code(cached_graph["graph"], language="text")
+
+
 def main():
     st.set_page_config(page_title="Git Safety Agent", layout="wide")
     st.title("Git Safety Agent")
@@ -335,6 +637,8 @@ def main():
             )
 
         with st.expander("模型配置", expanded=True):
+            from gsa.llm.llm_client import load_config
+
             cfg = load_config(workspace)
             base_options = {
                 "国内": "https://open.bigmodel.cn/api/paas/v4/",
@@ -369,15 +673,11 @@ def main():
             with col_q1:
                 if st.button("一键仓库概览", disabled=busy):
                     append_message("user", "一键仓库概览")
-                    append_message("assistant", "正在规划...", fmt="status")
                     st.session_state["pending_action"] = "repo_summarize"
-                    st.rerun()
             with col_q2:
                 if st.button("一键整理建议", disabled=busy):
                     append_message("user", "一键整理建议")
-                    append_message("assistant", "正在规划...", fmt="status")
                     st.session_state["pending_action"] = "organize_suggestions"
-                    st.rerun()
 
             with st.form("sidebar_chat", clear_on_submit=True, border=False):
                 user_input = st.text_input("输入自然语言任务", placeholder="输入自然语言任务...", disabled=busy, label_visibility="collapsed")
@@ -385,7 +685,6 @@ def main():
             if send and user_input.strip():
                 prefix = "计划执行" if chat_mode == "计划执行" else "索引问答"
                 append_message("user", f"{prefix}：{user_input}")
-                append_message("assistant", "正在规划...", fmt="status")
                 if chat_mode == "索引问答":
                     combined = user_input
                 else:
@@ -398,7 +697,6 @@ def main():
                         combined = user_input
                         st.session_state["pending_base_input"] = user_input
                 st.session_state["pending_chat"] = {"mode": chat_mode, "input": combined}
-                st.rerun()
 
         with st.expander("工作区", expanded=False):
             st.caption(f"当前：{workspace}")
@@ -408,32 +706,35 @@ def main():
                     st.error("路径不存在或不可访问")
                 else:
                     st.session_state["workspace"] = ws_input
-                    st.cache_data.clear()
+                    _clear_caches(get_tree_items, get_git_graph, get_sidebar_data)
                     st.rerun()
 
         with st.expander("目录结构", expanded=False):
-            query = st.text_input("快速搜索路径")
-            preview_enabled = st.checkbox("启用文件预览", value=True)
-            st.session_state["preview_enabled"] = preview_enabled
-            if st.button("刷新目录"):
-                st.cache_data.clear()
-            items = get_tree_items(workspace, 3)
-            if query:
-                items = [i for i in items if query in i]
-            tree = build_tree(items)
-            render_tree(tree)
+            _render_tree_panel(workspace)
 
         with st.expander("Git 历史", expanded=False):
-            n = st.slider("提交数量", 5, 80, 30)
-            branch = st.text_input("分支过滤（可选）", value="")
-            author = st.text_input("作者过滤（可选）", value="")
-            path = st.text_input("文件路径过滤（可选）", value="")
-            if st.button("刷新历史"):
-                st.cache_data.clear()
-            graph = get_git_graph(workspace, n, author, branch, path)
-            st.code(graph, language="text")
+            _render_git_history(workspace)
 
     with st.container():
+        # 侧边栏本轮提交的请求直接在这里处理，随后同一轮渲染结果，不再额外 st.rerun()
+        if not st.session_state.get("processing"):
+            pending_action = st.session_state.pop("pending_action", None)
+            pending_chat = st.session_state.pop("pending_chat", None)
+            jobs = []
+            if pending_action:
+                jobs.append(lambda: _handle_quick_action(orch, pending_action))
+            if pending_chat:
+                jobs.append(lambda: _handle_chat_request(orch, pending_chat["input"], pending_chat["mode"]))
+            for job in jobs:
+                st.session_state["processing"] = True
+                try:
+                    with st.spinner("正在规划..."):
+                        job()
+                except Exception as exc:
+                    append_message("assistant", f"执行失败：{exc}")
+                finally:
+                    st.session_state["processing"] = False
+
         messages = st.session_state.get("messages", [])
         if messages:
             st.markdown('<div id="section-chat"></div>', unsafe_allow_html=True)
@@ -453,36 +754,10 @@ def main():
                 unsafe_allow_html=True,
             )
 
-        pending_action = st.session_state.get("pending_action")
-        pending_chat = st.session_state.get("pending_chat")
-        if pending_action:
-            st.session_state["processing"] = True
-            try:
-                _handle_quick_action(orch, pending_action)
-            except Exception as exc:
-                append_message("assistant", f"执行失败：{exc}")
-            finally:
-                st.session_state["processing"] = False
-                st.session_state.pop("pending_action", None)
-                _clear_status_messages()
-            st.rerun()
-        if pending_chat:
-            st.session_state["processing"] = True
-            try:
-                _handle_chat_request(orch, pending_chat["input"], pending_chat["mode"])
-            except Exception as exc:
-                append_message("assistant", f"执行失败：{exc}")
-            finally:
-                st.session_state["processing"] = False
-                st.session_state.pop("pending_chat", None)
-                _clear_status_messages()
-            st.rerun()
-
         suggestions = st.session_state.get("last_suggestions")
         if suggestions and not st.session_state.get("suggestions_consumed") and not st.session_state.get("suggestions_prompt_shown"):
             if st.button("根据最近整理建议生成执行计划"):
                 append_message("user", "请根据最近整理建议生成可执行计划")
-                append_message("assistant", "正在规划...", fmt="status")
                 prompt = "以下是整理建议，请生成可执行的计划步骤：\n" + suggestions
                 st.session_state["suggestions_consumed"] = True
                 st.session_state["suggestions_prompt_shown"] = True
@@ -493,20 +768,26 @@ def main():
         selected_plan = None
         if plan_result and plan_result.plan:
             with st.expander("查看计划 JSON", expanded=False):
-                st.json(plan_result.plan.model_dump())
+                # 按 trace_id 缓存序列化结果，折叠状态下重跑也不用再遍历整个计划
+                cached = st.session_state.get("plan_json")
+                if not cached or cached[0] != plan_result.trace_id:
+                    cached = (plan_result.trace_id, plan_result.plan.model_dump())
+                    st.session_state["plan_json"] = cached
+                st.json(cached[1])
 
             st.subheader("执行控制")
-            st.caption("选择要执行的步骤（可多选）")
-            selected_indices: List[int] = []
-            for i, step in enumerate(plan_result.plan.steps):
-                key = f"step_select_{plan_result.trace_id}_{i}"
-                label = f"{i+1}. {step.tool}｜风险：{step.safety_level}｜原因：{step.safety_reason}"
-                checked = st.checkbox(label, value=True, key=key)
-                if checked:
-                    selected_indices.append(i)
+            steps = plan_result.plan.steps
+            # 一个多选框代替逐步骤的复选框，选项直接用步骤下标
+            selected_indices: List[int] = st.multiselect(
+                "选择要执行的步骤（可多选）",
+                list(range(len(steps))),
+                default=list(range(len(steps))),
+                format_func=lambda i: f"{i+1}. {steps[i].tool}｜风险：{steps[i].safety_level}｜原因：{steps[i].safety_reason}",
+                key=f"step_select_{plan_result.trace_id}",
+            )
 
             if selected_indices:
-                selected_steps = [s for idx, s in enumerate(plan_result.plan.steps) if idx in selected_indices]
+                selected_steps = [steps[i] for i in sorted(set(selected_indices))]
                 needs_confirm = any(s.safety_level in {"medium", "high"} for s in selected_steps)
                 selected_plan = plan_result.plan.model_copy(
                     update={"steps": selected_steps, "needs_confirmation": needs_confirm}
@@ -527,86 +808,8 @@ def main():
                         exec_res = orch.execute(selected_plan, plan_result.trace_id, confirmed=False)
                         st.session_state["exec_result"] = exec_res
 
-    exec_result = st.session_state.get("exec_result")
-    if exec_result:
-        st.markdown('<div id="section-result"></div>', unsafe_allow_html=True)
-        st.subheader("执行结果")
-        st.info(exec_result.get("summary", ""))
-        st.caption("执行明细")
-        for item in exec_result.get("results", []):
-            tool = item.get("tool", "")
-            ok = item.get("ok", False)
-            st.write(f"- {tool}：{'成功' if ok else '失败'}")
-        with st.expander("错误摘要", expanded=False):
-            has_error = False
-            for item in exec_result.get("results", []):
-                tool = item.get("tool", "")
-                if not item.get("ok"):
-                    st.markdown(f"**{tool}**")
-                    st.write(item.get("error", "未知错误"))
-                    has_error = True
-                    continue
-                result = item.get("result", {})
-                stderr = result.get("stderr")
-                if stderr:
-                    st.markdown(f"**{tool}**")
-                    st.code(stderr, language="text")
-                    has_error = True
-            if not has_error:
-                st.write("无错误。")
-        st.info(f"trace_id: {exec_result.get('trace_id')}")
-        log_path = os.path.join(orch.workspace, ".gsa", "logs")
-        st.info(f"日志目录：{log_path}")
-        try:
-            files = sorted(os.listdir(log_path))
-            if files:
-                latest = os.path.join(log_path, files[-1])
-                with open(latest, "r", encoding="utf-8") as f:
-                    lines = f.read().splitlines()[-50:]
-                st.code("\n".join(lines), language="json")
-        except Exception:
-            pass
-
-        if st.session_state.get("need_index"):
-            st.subheader("索引提示")
-            st.info(st.session_state.get("need_index_msg", "需要先构建索引。"))
-            if st.button("构建索引"):
-                with st.spinner("正在构建索引..."):
-                    res = orch.mcp.call_tool(
-                        "index_build",
-                        {"include_globs": ["**/*"], "exclude_globs": [], "dry_run": False},
-                    )
-                if res.get("ok", True):
-                    msg = (
-                        f"索引已构建：文档 {res.get('docs')}，"
-                        f"切片 {res.get('chunks')}。请重新提问。"
-                    )
-                    st.session_state["need_index"] = False
-                    st.session_state["need_index_msg"] = ""
-                else:
-                    msg = res.get("error", "索引构建失败")
-                st.write(msg)
-                append_message("assistant", msg)
-
-        if st.session_state.get("post_handle_rerun"):
-            st.session_state["post_handle_rerun"] = False
-            st.rerun()
-
-    preview_enabled = st.session_state.get("preview_enabled", True)
-    st.markdown('<div id="section-preview"></div>', unsafe_allow_html=True)
-    preview_path = st.session_state.get("preview_file", "")
-    if preview_enabled and preview_path:
-        st.subheader("文件预览")
-        st.caption(f"预览：{preview_path}")
-        content = orch.mcp.call_tool("file_read", {"path": preview_path})
-        if not content.get("ok", True):
-            st.error(content.get("error", "读取失败"))
-        else:
-            text = content.get("content", "")
-            if not text:
-                st.info("文件为空或无法显示（可能为二进制或内容过大）。")
-            else:
-                st.code(text, language="text")
+    _render_exec_result(orch.workspace)
+    _render_preview(orch.workspace)
 
 
 if __name__ == "__main__":
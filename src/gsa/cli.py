@@ -40,19 +40,22 @@ def cmd_run(args: argparse.Namespace) -> None:
 
 
 def cmd_ui(args: argparse.Namespace) -> None:
-    env = os.environ.copy()
-    env["GSA_WORKSPACE"] = args.workspace
+    # 在当前进程内启动 streamlit，省掉一次子进程启动与整包重新导入
+    from streamlit.web import bootstrap
+
     import gsa.app.ui as ui_module
 
+    os.environ["GSA_WORKSPACE"] = args.workspace
     ui_path = os.path.abspath(ui_module.__file__)
-    cmd = ["streamlit", "run", ui_path]
+    flag_options = {}
     try:
         import watchdog  # type: ignore
 
-        cmd.append("--server.fileWatcherType=watchdog")
+        flag_options["server_fileWatcherType"] = "watchdog"
     except Exception:
         pass
-    subprocess.run(cmd, env=env)
+    bootstrap.load_config_options(flag_options)
+    bootstrap.run(ui_path, False, [], flag_options)
 
 
 def cmd_api(args: argparse.Namespace) -> None:
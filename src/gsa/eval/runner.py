@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import argparse
+import asyncio
+import contextlib
 import json
 import os
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import yaml
 
 from gsa.agent.orchestrator import Orchestrator
+from gsa.agent.schema import PlanResult
 
 
 def load_cases(path: str) -> List[Dict[str, Any]]:
@@ -14,14 +18,27 @@ def load_cases(path: str) -> List[Dict[str, Any]]:
         return yaml.safe_load(f) or []
 
 
+# 同时在途的规划请求上限（GSA_EVAL_CONCURRENCY），避免触发 LLM 接口限流；仅 --llm 时有意义
+DEFAULT_EVAL_CONCURRENCY = 20
+
+
 def evaluate_case(orch: Orchestrator, case: Dict[str, Any]) -> Dict[str, Any]:
+    return _check_case(case, orch.plan(case.get("input", "")))
+
+
+async def aevaluate_case(orch: Orchestrator, case: Dict[str, Any], sem: asyncio.Semaphore) -> Dict[str, Any]:
+    async with sem:
+        plan_result = await orch.aplan(case.get("input", ""))
+    return _check_case(case, plan_result)
+
+
+def _check_case(case: Dict[str, Any], plan_result: PlanResult) -> Dict[str, Any]:
     result = {
         "name": case.get("name"),
         "input": case.get("input"),
         "passed": True,
         "errors": [],
     }
-    plan_result = orch.plan(case.get("input", ""))
     plan = plan_result.plan
     if not plan:
         result["passed"] = False
@@ -50,11 +67,22 @@ def evaluate_case(orch: Orchestrator, case: Dict[str, Any]) -> Dict[str, Any]:
     return result
 
 
-def main() -> None:
+async def _evaluate_all(orch: Orchestrator, cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    sem = asyncio.Semaphore(int(os.environ.get("GSA_EVAL_CONCURRENCY", DEFAULT_EVAL_CONCURRENCY)))
+    # LLM 评测时所有用例共用一个连接池；规则规划不发请求，不必创建
+    async with orch.planner.asession() if orch.use_llm else contextlib.nullcontext():
+        return await asyncio.gather(*(aevaluate_case(orch, c, sem) for c in cases))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m gsa.eval.runner")
+    # 默认评测规则规划器（无需 Key）；--llm 时经 aplan 并发请求 LLM 规划
+    parser.add_argument("--llm", action="store_true", help="使用 LLM 规划器评测（需要 API Key）")
+    args = parser.parse_args(argv)
     workspace = os.getcwd()
-    orch = Orchestrator(workspace, use_llm=False)
+    orch = Orchestrator(workspace, use_llm=args.llm)
     cases = load_cases(os.path.join(os.path.dirname(__file__), "test_cases.yaml"))
-    results = [evaluate_case(orch, c) for c in cases]
+    results = asyncio.run(_evaluate_all(orch, cases))
     passed = sum(1 for r in results if r["passed"])
     total = len(results)
     print(json.dumps({"passed": passed, "total": total, "results": results}, ensure_ascii=False, indent=2))
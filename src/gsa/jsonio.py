@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import json
+from collections import deque
+from typing import Any, Union
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # 可选依赖，未安装时使用标准库 json
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (deque, set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"无法序列化类型：{type(obj).__name__}")
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """序列化为 UTF-8 字节（非 ASCII 字符原样输出）。"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    if indent:
+        text = json.dumps(obj, ensure_ascii=False, indent=2, default=_default)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default)
+    return text.encode("utf-8")
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
 import os
+import random
+import time
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, replace
-from typing import Any, Dict, Iterable, List, Optional
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from gsa import jsonio
 
-import httpx
 import yaml
 
 
@@ -22,24 +29,72 @@ class LLMConfig:
     timeout: float = 300.0
     connect_timeout: float = 8.0
     max_retries: int = 2
+    plan_cache_size: int = 128
 
 
 class LLMKeyMissing(RuntimeError):
     pass
 
 
+# 与 SDK 一致：这些状态码视为暂时性错误，按指数退避重试
+_RETRY_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504})
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
 
 
-def load_config(workspace: Optional[str] = None) -> LLMConfig:
-    """从环境变量与 config.yaml 读取配置。"""
-    api_key = os.environ.get("BIGMODEL_API_KEY", "") or os.environ.get("ZAI_API_KEY", "")
-    env_base_url = os.environ.get("ZAI_BASE_URL", "") or os.environ.get("BIGMODEL_BASE_URL", "")
-    env_model = os.environ.get("GLM_MODEL", "") or os.environ.get("GSA_MODEL", "")
+def _retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """优先采用服务端给出的 Retry-After（秒），否则指数退避并加少量抖动。"""
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0.0), 60.0)
+        except ValueError:
+            pass
+    return min(RETRY_BASE_DELAY * 2**attempt, RETRY_MAX_DELAY) * (1 - 0.25 * random.random())
+
+
+# 有 libyaml 时用 C 版加载器，比纯 Python 解析快数倍
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_CONFIG_ENV_VARS = (
+    "BIGMODEL_API_KEY",
+    "ZAI_API_KEY",
+    "ZAI_BASE_URL",
+    "BIGMODEL_BASE_URL",
+    "GLM_MODEL",
+    "GSA_MODEL",
+)
+
+
+def _config_paths(workspace: Optional[str]) -> List[str]:
     config_paths = []
     if workspace:
         config_paths.append(os.path.join(workspace, "config.yaml"))
         config_paths.append(os.path.join(workspace, ".gsa", "config.yaml"))
     config_paths.append(os.path.expanduser("~/.gsa/config.yaml"))
+    return config_paths
+
+
+def load_config(workspace: Optional[str] = None) -> LLMConfig:
+    """从环境变量与 config.yaml 读取配置。
+
+    按（环境变量，各配置文件 mtime）缓存解析结果，配置未变时不再重复读盘解析 YAML；
+    返回副本，调用方可以随意修改。
+    """
+    stamps = []
+    for path in _config_paths(workspace):
+        try:
+            stamps.append((path, os.stat(path).st_mtime_ns))
+        except OSError:
+            continue
+    env = tuple(os.environ.get(name, "") for name in _CONFIG_ENV_VARS)
+    return replace(_load_config_cached(env, tuple(stamps)))
+
+
+@lru_cache(maxsize=16)
+def _load_config_cached(env: Tuple[str, ...], stamps: Tuple[Tuple[str, int], ...]) -> LLMConfig:
+    values = dict(zip(_CONFIG_ENV_VARS, env))
+    api_key = values["BIGMODEL_API_KEY"] or values["ZAI_API_KEY"]
+    env_base_url = values["ZAI_BASE_URL"] or values["BIGMODEL_BASE_URL"]
+    env_model = values["GLM_MODEL"] or values["GSA_MODEL"]
 
     cfg = LLMConfig()
     if env_base_url:
@@ -47,12 +102,10 @@ def load_config(workspace: Optional[str] = None) -> LLMConfig:
     if env_model:
         cfg.model = env_model
 
-    for path in config_paths:
-        if not path or not os.path.exists(path):
-            continue
+    for path, _ in stamps:
         try:
             with open(path, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f) or {}
+                data = yaml.load(f, Loader=_YAML_LOADER) or {}
             if isinstance(data, dict):
                 if data.get("BIGMODEL_API_KEY"):
                     api_key = str(data.get("BIGMODEL_API_KEY"))
@@ -72,6 +125,8 @@ def load_config(workspace: Optional[str] = None) -> LLMConfig:
                     cfg.connect_timeout = float(data.get("GLM_CONNECT_TIMEOUT"))
                 if data.get("GLM_MAX_RETRIES") is not None:
                     cfg.max_retries = int(data.get("GLM_MAX_RETRIES"))
+                if data.get("GSA_PLAN_CACHE_SIZE") is not None:
+                    cfg.plan_cache_size = int(data.get("GSA_PLAN_CACHE_SIZE"))
         except Exception:
             continue
 
@@ -98,6 +153,39 @@ def _extract_content(response: Any) -> str:
     return getattr(message, "content", "") or ""
 
 
+def _coalesce(chunks: Iterable[str], flush_ms: float, flush_chars: int) -> Iterator[str]:
+    """合并零碎片段：累计够 flush_chars 个字符或距上次输出超过 flush_ms 毫秒才产出一次。"""
+    buf: List[str] = []
+    size = 0
+    last = time.monotonic()
+    for chunk in chunks:
+        buf.append(chunk)
+        size += len(chunk)
+        now = time.monotonic()
+        if size >= flush_chars or (now - last) * 1000 >= flush_ms:
+            yield "".join(buf)
+            buf.clear()
+            size = 0
+            last = now
+    if buf:
+        yield "".join(buf)
+
+
+@lru_cache(maxsize=4)
+def _shared_sdk_client(api_key: str, base_url: str, timeout: float, connect_timeout: float, max_retries: int):
+    """相同连接参数的 LLMClient 共用一个 SDK 客户端（及其连接池），跨工作区也能复用长连接。"""
+    import httpx
+    from zai import ZaiClient, ZhipuAiClient
+
+    ClientClass = ZhipuAiClient if "open.bigmodel.cn" in base_url else ZaiClient
+    return ClientClass(
+        api_key=api_key,
+        base_url=base_url,
+        timeout=httpx.Timeout(timeout=timeout, connect=connect_timeout),
+        max_retries=max_retries,
+    )
+
+
 class LLMClient:
     """GLM-4.7 客户端（基于 zai-sdk）。"""
 
@@ -105,6 +193,10 @@ class LLMClient:
         self.config = config or LLMConfig()
         self.config.thinking_enabled = False
         self._client = None
+        # asession() 内共享的 AsyncClient；按上下文区分，不同事件循环、不同任务组互不干扰
+        self._session: "contextvars.ContextVar[Any]" = contextvars.ContextVar(
+            f"gsa_llm_session_{id(self)}", default=None
+        )
 
     def _ensure_key(self) -> None:
         if not self.config.api_key:
@@ -114,17 +206,89 @@ class LLMClient:
 
     def _get_client(self):
         if self._client is None:
-            from zai import ZaiClient, ZhipuAiClient
-            timeout = httpx.Timeout(timeout=self.config.timeout, connect=self.config.connect_timeout)
-            ClientClass = ZhipuAiClient if "open.bigmodel.cn" in self.config.base_url else ZaiClient
-            self._client = ClientClass(
-                api_key=self.config.api_key,
-                base_url=self.config.base_url,
-                timeout=timeout,
-                max_retries=self.config.max_retries,
+            cfg = self.config
+            self._client = _shared_sdk_client(
+                cfg.api_key, cfg.base_url, cfg.timeout, cfg.connect_timeout, cfg.max_retries
             )
         return self._client
 
+    def _new_aclient(self):
+        import httpx
+
+        return httpx.AsyncClient(
+            base_url=self.config.base_url,
+            timeout=httpx.Timeout(self.config.timeout, connect=self.config.connect_timeout),
+            headers={"Authorization": f"Bearer {self.config.api_key}"},
+            # 传输层只重试建立连接失败；状态码与超时的重试见 _asend
+            transport=httpx.AsyncHTTPTransport(retries=self.config.max_retries),
+        )
+
+    @asynccontextmanager
+    async def asession(self) -> AsyncIterator[None]:
+        """块内的异步调用共用一个连接池，退出时关闭；AsyncClient 绑定事件循环，不跨 asyncio.run 缓存。"""
+        if self._session.get() is not None:
+            yield
+            return
+        client = self._new_aclient()
+        token = self._session.set(client)
+        try:
+            yield
+        finally:
+            self._session.reset(token)
+            await client.aclose()
+
+    @asynccontextmanager
+    async def _aclient(self) -> AsyncIterator[Any]:
+        client = self._session.get()
+        if client is not None:
+            yield client
+            return
+        async with self._new_aclient() as client:
+            yield client
+
+    async def _asend(self, client: Any, body: Dict[str, Any], stream: bool = False) -> Any:
+        """发送请求，对暂时性状态码与超时按退避重试；返回状态正常的响应。"""
+        import httpx
+
+        attempt = 0
+        while True:
+            can_retry = attempt < self.config.max_retries
+            try:
+                resp = await client.send(client.build_request("POST", "chat/completions", json=body), stream=stream)
+            except httpx.TimeoutException:
+                if not can_retry:
+                    raise
+                delay = _retry_delay(attempt)
+            else:
+                if resp.status_code not in _RETRY_STATUS or not can_retry:
+                    break
+                await resp.aclose()
+                delay = _retry_delay(attempt, resp.headers.get("retry-after"))
+            await asyncio.sleep(delay)
+            attempt += 1
+        if resp.is_error:
+            await resp.aread()
+            await resp.aclose()
+            resp.raise_for_status()
+        return resp
+
+    def _request_body(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        stream: bool = False,
+    ) -> Dict[str, Any]:
+        body: Dict[str, Any] = {
+            "model": self.config.model,
+            "messages": messages,
+            "temperature": temperature if temperature is not None else self.config.temperature,
+            "max_tokens": max_tokens if max_tokens is not None else self.config.max_tokens,
+        }
+        if stream:
+            body["stream"] = True
+        return body
+
     def chat(
         self,
         messages: List[Dict[str, str]],
@@ -173,3 +337,79 @@ class LLMClient:
                     yield delta.content
             except Exception:
                 continue
+
+    def chat_stream_batched(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        flush_ms: float = 50,
+        flush_chars: int = 64,
+    ) -> Iterable[str]:
+        """按时间/长度合并后的 chat_stream，减少下游（如 UI 刷新）的处理次数。"""
+        return _coalesce(
+            self.chat_stream(messages, temperature=temperature, max_tokens=max_tokens),
+            flush_ms,
+            flush_chars,
+        )
+
+    async def achat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """异步版 chat，直接请求 REST 接口，返回原始 JSON。"""
+        self._ensure_key()
+        async with self._aclient() as client:
+            resp = await self._asend(client, self._request_body(messages, temperature, max_tokens))
+        return jsonio.loads(resp.content)
+
+    async def achat_text(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> str:
+        resp = await self.achat(messages, temperature=temperature, max_tokens=max_tokens)
+        return _extract_content(resp)
+
+    async def achat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        self._ensure_key()
+        body = self._request_body(messages, temperature, max_tokens, stream=True)
+        async with self._aclient() as client:
+            resp = await self._asend(client, body, stream=True)
+            try:
+                async for line in resp.aiter_lines():
+                    # SSE 格式：data: {...}，以 data: [DONE] 结束
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        content = jsonio.loads(data)["choices"][0]["delta"].get("content")
+                    except Exception:
+                        continue
+                    if content:
+                        yield content
+            finally:
+                await resp.aclose()
+
+    async def gather_chats(
+        self,
+        message_lists: List[List[Dict[str, str]]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> List[Any]:
+        """并发发起多组对话，按输入顺序返回文本；失败的位置放异常对象。"""
+        async with self.asession():
+            return await asyncio.gather(
+                *(self.achat_text(m, temperature=temperature, max_tokens=max_tokens) for m in message_lists),
+                return_exceptions=True,
+            )
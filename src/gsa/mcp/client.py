@@ -1,13 +1,22 @@
 from __future__ import annotations
 
-import json
+import os
 import subprocess
 import sys
-from typing import Any, Dict, List, Optional
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from gsa import jsonio
 
 
 class MCPClient:
-    """最小 MCP 客户端（stdio JSON-RPC）。"""
+    """最小 MCP 客户端（stdio JSON-RPC）。
+
+    后台线程读取 stdout 并按 id 分发响应，多个线程可以同时发起调用。
+    """
+
+    # 支持一次写出多个请求（call_tools），编排器据此决定是否预取连续的只读步骤
+    pipelined = True
 
     def __init__(self, workspace: str):
         self.workspace = workspace
@@ -16,31 +25,79 @@ class MCPClient:
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
         )
         self._id = 0
+        # _lock 保护 id 分配与下面两个表；写 stdin 单独加锁，
+        # 否则写满管道时读线程拿不到 _lock，双方互等
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._events: Dict[int, threading.Event] = {}
+        self._responses: Dict[int, Dict[str, Any]] = {}
+        self._closed = False
+        self._reader = threading.Thread(target=self._reader_loop, daemon=True)
+        self._reader.start()
+
+    def _reader_loop(self) -> None:
+        stdout = self.proc.stdout
+        if stdout is not None:
+            for line in stdout:
+                try:
+                    resp = jsonio.loads(line)
+                except Exception:
+                    continue
+                with self._lock:
+                    event = self._events.get(resp.get("id"))
+                    if event is not None:
+                        self._responses[resp["id"]] = resp
+                        event.set()
+        # 进程退出：唤醒所有等待者，由 _collect 报告连接中断
+        with self._lock:
+            self._closed = True
+            for event in self._events.values():
+                event.set()
+
+    def _submit(self, requests: List[Tuple[str, Optional[Dict[str, Any]]]]) -> List[int]:
+        """登记并写出一批请求，只 flush 一次。"""
+        ids: List[int] = []
+        lines: List[bytes] = []
+        with self._lock:
+            if self._closed or not self.proc.stdin:
+                raise RuntimeError("MCP 进程不可用")
+            for method, params in requests:
+                self._id += 1
+                req: Dict[str, Any] = {"jsonrpc": "2.0", "id": self._id, "method": method}
+                if params is not None:
+                    req["params"] = params
+                self._events[self._id] = threading.Event()
+                ids.append(self._id)
+                lines.append(jsonio.dumps(req) + b"\n")
+        with self._write_lock:
+            self.proc.stdin.write(b"".join(lines))
+            self.proc.stdin.flush()
+        return ids
+
+    def _collect(self, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        responses: Dict[int, Dict[str, Any]] = {}
+        for req_id in ids:
+            self._events[req_id].wait()
+            with self._lock:
+                self._events.pop(req_id, None)
+                resp = self._responses.pop(req_id, None)
+            if resp is not None:
+                responses[req_id] = resp
+        if len(responses) < len(ids):
+            raise RuntimeError("MCP 连接中断")
+        return responses
+
+    @staticmethod
+    def _result(resp: Dict[str, Any]) -> Any:
+        if resp.get("error"):
+            raise RuntimeError(resp["error"].get("message"))
+        return resp.get("result")
 
     def _send(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        if not self.proc.stdin or not self.proc.stdout:
-            raise RuntimeError("MCP 进程不可用")
-        self._id += 1
-        req = {"jsonrpc": "2.0", "id": self._id, "method": method}
-        if params is not None:
-            req["params"] = params
-        self.proc.stdin.write(json.dumps(req, ensure_ascii=False) + "\n")
-        self.proc.stdin.flush()
-        while True:
-            line = self.proc.stdout.readline()
-            if not line:
-                raise RuntimeError("MCP 连接中断")
-            try:
-                resp = json.loads(line)
-            except Exception:
-                continue
-            if resp.get("id") == self._id:
-                if resp.get("error"):
-                    raise RuntimeError(resp["error"].get("message"))
-                return resp.get("result")
+        req_id = self._submit([(method, params)])[0]
+        return self._result(self._collect([req_id])[req_id])
 
     def list_tools(self) -> List[str]:
         data = self._send("tools/list")
@@ -49,6 +106,21 @@ class MCPClient:
     def call_tool(self, name: str, args: Dict[str, Any]) -> Dict[str, Any]:
         return self._send("tools/call", {"name": name, "args": args})
 
+    def call_tools(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Any]:
+        """流水线批量调用：一次写出全部请求，再按 id 收集响应。
+
+        单个调用失败时，对应位置返回 RuntimeError 实例而不是抛出。
+        """
+        ids = self._submit([("tools/call", {"name": name, "args": args}) for name, args in calls])
+        responses = self._collect(ids)
+        results: List[Any] = []
+        for req_id in ids:
+            try:
+                results.append(self._result(responses[req_id]))
+            except RuntimeError as exc:
+                results.append(exc)
+        return results
+
     def list_resources(self) -> List[Dict[str, Any]]:
         data = self._send("resources/list")
         return data.get("resources", [])
@@ -59,3 +131,57 @@ class MCPClient:
     def close(self) -> None:
         if self.proc:
             self.proc.terminate()
+
+
+class InProcessMCPClient:
+    """进程内 MCP 客户端：直接调用 MCPServer.handle，省去子进程与 JSON 编解码。"""
+
+    # 没有往返开销，批量调用等同逐个调用，编排器不必预取
+    pipelined = False
+
+    def __init__(self, workspace: str):
+        from gsa.mcp.server import MCPServer
+
+        self.workspace = workspace
+        self.server = MCPServer(workspace)
+        self._id = 0
+
+    def _send(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self._id += 1
+        req: Dict[str, Any] = {"jsonrpc": "2.0", "id": self._id, "method": method}
+        if params is not None:
+            req["params"] = params
+        return MCPClient._result(self.server.handle(req))
+
+    def list_tools(self) -> List[str]:
+        return self.server.registry.names()
+
+    def call_tool(self, name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        return self._send("tools/call", {"name": name, "args": args})
+
+    def call_tools(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Any]:
+        """与 MCPClient.call_tools 约定一致：失败的位置返回 RuntimeError 实例。"""
+        results: List[Any] = []
+        for name, args in calls:
+            try:
+                results.append(self.call_tool(name, args))
+            except RuntimeError as exc:
+                results.append(exc)
+        return results
+
+    def list_resources(self) -> List[Dict[str, Any]]:
+        data = self._send("resources/list")
+        return data.get("resources", [])
+
+    def read_resource(self, uri: str) -> Dict[str, Any]:
+        return self._send("resources/read", {"uri": uri})
+
+    def close(self) -> None:
+        self.server.close()
+
+
+def connect(workspace: str):
+    """默认在进程内运行工具；设置 GSA_MCP_REMOTE 时改用独立的 stdio 子进程。"""
+    if os.environ.get("GSA_MCP_REMOTE"):
+        return MCPClient(workspace)
+    return InProcessMCPClient(workspace)
@@ -1,15 +1,49 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple
 import inspect
 
+Dispatch = Callable[[Dict[str, Any]], Dict[str, Any]]
+
 
 @dataclass
 class ToolSpec:
     name: str
     description: str
     func: Callable[..., Dict[str, Any]]
+    # 注册时解析一次签名，调用时只做集合查找
+    accepts_var_kw: bool = False
+    param_names: FrozenSet[str] = frozenset()
+    # 按上面两项预先生成的调用闭包：args -> 结果
+    dispatch: Optional[Dispatch] = None
+
+
+def _make_dispatch(func: Callable[..., Dict[str, Any]], accepts_var_kw: bool, names: FrozenSet[str]) -> Dispatch:
+    if accepts_var_kw:
+        return lambda args: func(**args)
+
+    def dispatch(args: Dict[str, Any]) -> Dict[str, Any]:
+        # 常见情况下参数都合法，整体子集判断即可，不必逐个过滤
+        if args.keys() <= names:
+            return func(**args)
+        return func(**{k: v for k, v in args.items() if k in names})
+
+    return dispatch
+
+
+# 签名解析结果按底层函数缓存：同一方法在不同实例上的参数表相同
+_SIGNATURES: Dict[Callable[..., Any], Tuple[bool, FrozenSet[str]]] = {}
+
+
+def _signature(func: Callable[..., Dict[str, Any]]) -> Tuple[bool, FrozenSet[str]]:
+    key = getattr(func, "__func__", func)
+    cached = _SIGNATURES.get(key)
+    if cached is None:
+        params = inspect.signature(func).parameters
+        cached = (any(p.kind == p.VAR_KEYWORD for p in params.values()), frozenset(params))
+        _SIGNATURES[key] = cached
+    return cached
 
 
 class ToolRegistry:
@@ -19,20 +53,24 @@ class ToolRegistry:
         self._tools: Dict[str, ToolSpec] = {}
 
     def register(self, name: str, description: str, func: Callable[..., Dict[str, Any]]) -> None:
-        self._tools[name] = ToolSpec(name=name, description=description, func=func)
+        accepts_var_kw, param_names = _signature(func)
+        self._tools[name] = ToolSpec(
+            name=name,
+            description=description,
+            func=func,
+            accepts_var_kw=accepts_var_kw,
+            param_names=param_names,
+            dispatch=_make_dispatch(func, accepts_var_kw, param_names),
+        )
 
     def list_tools(self) -> Dict[str, Dict[str, str]]:
         return {name: {"description": spec.description} for name, spec in self._tools.items()}
 
     def call(self, name: str, args: Dict[str, Any]) -> Dict[str, Any]:
-        if name not in self._tools:
+        spec = self._tools.get(name)
+        if spec is None:
             raise ValueError(f"未注册工具：{name}")
-        func = self._tools[name].func
-        sig = inspect.signature(func)
-        if any(p.kind == p.VAR_KEYWORD for p in sig.parameters.values()):
-            return func(**args)
-        filtered = {k: v for k, v in (args or {}).items() if k in sig.parameters}
-        return func(**filtered)
+        return spec.dispatch(args or {})
 
     def names(self):
         return list(self._tools.keys())
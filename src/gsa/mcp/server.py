@@ -1,11 +1,11 @@
 from __future__ import annotations
 
 import argparse
-import json
 import os
 import sys
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from gsa import jsonio
 from gsa.mcp.registry import ToolRegistry
 from gsa.tools.file_impl import FileTool
 from gsa.tools.git_impl import GitTool
@@ -15,6 +15,46 @@ from gsa.tools.index_impl import IndexTool
 class MCPServer:
     """最小 MCP 兼容服务（stdio JSON-RPC 风格）。"""
 
+    # (工具名, 描述, 工具对象属性, 方法名)；类级常量，构造实例时只需逐项绑定
+    _TOOL_TABLE = (
+        # Git 只读
+        ("git_status", "查看 git 状态", "git_tool", "status"),
+        ("git_diff", "查看 git diff", "git_tool", "diff"),
+        ("git_log", "查看 git 日志", "git_tool", "log"),
+        ("git_log_graph", "图形化日志", "git_tool", "log_graph"),
+        ("git_branch_list", "列出分支", "git_tool", "branch_list"),
+        ("git_remote_list", "列出远端", "git_tool", "remote_list"),
+        ("git_show", "查看对象", "git_tool", "show"),
+        ("git_cat_file", "读取对象内容", "git_tool", "cat_object"),
+        ("repo_snapshot", "一次获取状态/分支/日志", "git_tool", "snapshot"),
+
+        # Git 写操作
+        ("git_init", "初始化仓库", "git_tool", "init_repo"),
+        ("git_add", "暂存文件", "git_tool", "add"),
+        ("git_commit", "提交", "git_tool", "commit"),
+        ("git_switch", "切换分支", "git_tool", "switch"),
+        ("git_create_branch", "创建分支", "git_tool", "create_branch"),
+        ("git_delete_branch", "删除分支", "git_tool", "delete_branch"),
+        ("git_stash_push", "stash 保存", "git_tool", "stash_push"),
+        ("git_stash_pop", "stash 恢复", "git_tool", "stash_pop"),
+        ("git_merge", "合并分支", "git_tool", "merge"),
+
+        # 文件工具
+        ("file_list", "列出目录", "file_tool", "list_dir"),
+        ("file_read", "读取文件", "file_tool", "read"),
+        ("file_write", "写入文件", "file_tool", "write"),
+        ("file_patch", "补丁修改", "file_tool", "patch"),
+        ("file_search", "搜索内容", "file_tool", "search"),
+
+        # 索引工具
+        ("index_build", "构建索引", "index_tool", "build"),
+        ("index_status", "索引状态", "index_tool", "status"),
+        ("index_search", "索引搜索", "index_tool", "search"),
+        ("repo_summarize", "仓库概览", "index_tool", "repo_summarize"),
+        ("organize_suggestions", "整理建议", "index_tool", "organize_suggestions"),
+        ("index_qa", "索引问答", "index_tool", "qa"),
+    )
+
     def __init__(self, workspace: str):
         self.workspace = workspace
         self.registry = ToolRegistry()
@@ -22,65 +62,68 @@ class MCPServer:
         self.git_tool = GitTool(workspace)
         self.index_tool = IndexTool(workspace)
         self._register_tools()
+        # 资源读取缓存：(目录 mtime_ns, 结果)
+        self._ws_count: Optional[Tuple[int, int]] = None
+        self._recent_logs_cache: Optional[Tuple[int, List[str]]] = None
+        # JSON-RPC 方法名 -> 处理函数，handle 只做一次字典查找
+        self._methods: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+            "tools/list": self._m_tools_list,
+            "tools/call": self._m_tools_call,
+            "resources/list": self._m_resources_list,
+            "resources/read": self._m_resources_read,
+        }
 
     def _register_tools(self) -> None:
-        # Git 只读
-        self.registry.register("git_status", "查看 git 状态", self.git_tool.status)
-        self.registry.register("git_diff", "查看 git diff", self.git_tool.diff)
-        self.registry.register("git_log", "查看 git 日志", self.git_tool.log)
-        self.registry.register("git_log_graph", "图形化日志", self.git_tool.log_graph)
-        self.registry.register("git_branch_list", "列出分支", self.git_tool.branch_list)
-        self.registry.register("git_remote_list", "列出远端", self.git_tool.remote_list)
-        self.registry.register("git_show", "查看对象", self.git_tool.show)
-
-        # Git 写操作
-        self.registry.register("git_init", "初始化仓库", self.git_tool.init_repo)
-        self.registry.register("git_add", "暂存文件", self.git_tool.add)
-        self.registry.register("git_commit", "提交", self.git_tool.commit)
-        self.registry.register("git_switch", "切换分支", self.git_tool.switch)
-        self.registry.register("git_create_branch", "创建分支", self.git_tool.create_branch)
-        self.registry.register("git_delete_branch", "删除分支", self.git_tool.delete_branch)
-        self.registry.register("git_stash_push", "stash 保存", self.git_tool.stash_push)
-        self.registry.register("git_stash_pop", "stash 恢复", self.git_tool.stash_pop)
-        self.registry.register("git_merge", "合并分支", self.git_tool.merge)
+        for name, desc, obj_attr, method in self._TOOL_TABLE:
+            self.registry.register(name, desc, getattr(getattr(self, obj_attr), method))
 
-        # 文件工具
-        self.registry.register("file_list", "列出目录", self.file_tool.list_dir)
-        self.registry.register("file_read", "读取文件", self.file_tool.read)
-        self.registry.register("file_write", "写入文件", self.file_tool.write)
-        self.registry.register("file_patch", "补丁修改", self.file_tool.patch)
-        self.registry.register("file_search", "搜索内容", self.file_tool.search)
-
-        # 索引工具
-        self.registry.register("index_build", "构建索引", self.index_tool.build)
-        self.registry.register("index_status", "索引状态", self.index_tool.status)
-        self.registry.register("index_search", "索引搜索", self.index_tool.search)
-        self.registry.register("repo_summarize", "仓库概览", self.index_tool.repo_summarize)
-        self.registry.register("organize_suggestions", "整理建议", self.index_tool.organize_suggestions)
-        self.registry.register("index_qa", "索引问答", self.index_tool.qa)
+    def close(self) -> None:
+        self.git_tool.close()
 
     def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        method = request.get("method")
         req_id = request.get("id")
         try:
-            if method == "tools/list":
-                result = {"tools": self.registry.list_tools()}
-            elif method == "tools/call":
-                params = request.get("params") or {}
-                name = params.get("name")
-                args = params.get("args") or {}
-                result = self.registry.call(name, args)
-            elif method == "resources/list":
-                result = {"resources": self._resources_list()}
-            elif method == "resources/read":
-                params = request.get("params") or {}
-                result = self._resources_read(params.get("uri"))
-            else:
+            handler = self._methods.get(request.get("method"))
+            if handler is None:
                 raise ValueError("未知方法")
+            result = handler(request.get("params") or {})
             return {"jsonrpc": "2.0", "id": req_id, "result": result}
         except Exception as exc:
             return {"jsonrpc": "2.0", "id": req_id, "error": {"message": str(exc)}}
 
+    def _m_tools_list(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {"tools": self.registry.list_tools()}
+
+    def _m_tools_call(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self.registry.call(params.get("name"), params.get("args") or {})
+
+    def _m_resources_list(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {"resources": self._resources_list()}
+
+    def _m_resources_read(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self._resources_read(params.get("uri"))
+
+    def _workspace_count(self) -> int:
+        # 目录的 mtime 随子项增删而变化，未变时直接复用上次的计数
+        try:
+            mtime = os.stat(self.workspace).st_mtime_ns
+        except OSError:
+            return 0
+        if self._ws_count is None or self._ws_count[0] != mtime:
+            with os.scandir(self.workspace) as it:
+                self._ws_count = (mtime, sum(1 for _ in it))
+        return self._ws_count[1]
+
+    def _recent_logs(self) -> List[str]:
+        log_dir = os.path.join(self.workspace, ".gsa", "logs")
+        try:
+            mtime = os.stat(log_dir).st_mtime_ns
+        except OSError:
+            return []
+        if self._recent_logs_cache is None or self._recent_logs_cache[0] != mtime:
+            self._recent_logs_cache = (mtime, sorted(os.listdir(log_dir))[-5:])
+        return list(self._recent_logs_cache[1])
+
     def _resources_list(self):
         return [
             {"uri": "workspace/info", "description": "工作区信息"},
@@ -91,21 +134,11 @@ class MCPServer:
 
     def _resources_read(self, uri: str):
         if uri == "workspace/info":
-            return {
-                "uri": uri,
-                "content": {
-                    "workspace": self.workspace,
-                    "files": len(os.listdir(self.workspace)) if os.path.exists(self.workspace) else 0,
-                },
-            }
+            return {"uri": uri, "content": {"workspace": self.workspace, "files": self._workspace_count()}}
         if uri == "index/status":
             return {"uri": uri, "content": self.index_tool.status()}
         if uri == "logs/recent":
-            log_dir = os.path.join(self.workspace, ".gsa", "logs")
-            files = []
-            if os.path.exists(log_dir):
-                files = sorted(os.listdir(log_dir))[-5:]
-            return {"uri": uri, "content": {"files": files}}
+            return {"uri": uri, "content": {"files": self._recent_logs()}}
         if uri == "dir/summary":
             return {"uri": uri, "content": self.file_tool.summary()}
         raise ValueError("未知资源")
@@ -116,17 +149,32 @@ def main() -> None:
     parser.add_argument("--workspace", required=True)
     args = parser.parse_args()
     server = MCPServer(args.workspace)
-    for line in sys.stdin:
-        line = line.strip()
-        if not line:
-            continue
-        try:
-            req = json.loads(line)
-        except Exception:
-            continue
-        resp = server.handle(req)
-        sys.stdout.write(json.dumps(resp, ensure_ascii=False) + "\n")
-        sys.stdout.flush()
+    # 直接读写字节流：jsonio 输出 UTF-8 字节，省去文本层的编解码
+    stdin = sys.stdin.buffer
+    out = sys.stdout.buffer
+    handle, loads, dumps = server.handle, jsonio.loads, jsonio.dumps
+    pending = b""
+    while True:
+        # read1 返回当前已到达的数据；一批请求全部处理完再 flush 一次
+        chunk = stdin.read1(65536)
+        if chunk:
+            *lines, pending = (pending + chunk).split(b"\n")
+        else:
+            # EOF：末尾没有换行的最后一条请求也要处理
+            lines, pending = [pending], b""
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                req = loads(line)
+            except Exception:
+                continue
+            out.write(dumps(handle(req)) + b"\n")
+        out.flush()
+        if not chunk:
+            break
+    server.close()
 
 
 if __name__ == "__main__":
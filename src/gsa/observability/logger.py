@@ -1,13 +1,109 @@
 from __future__ import annotations
 
-import json
+import atexit
 import os
+import queue
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Any, Dict
+from typing import IO, Any, Dict, Iterable, List, Optional, Tuple
+
+from gsa import jsonio
+
+# 写入队列上限：队列满时 log() 阻塞等待，不丢弃审计事件
+MAX_PENDING_WRITES = 10000
+# 单批最多合并的写入请求数
+MAX_BATCH = 256
+# 后台线程保持打开的日志文件句柄数
+MAX_OPEN_FILES = 16
+
+
+class _LogWriter:
+    """进程内共享的后台写线程：合并多条事件，按文件一次写入。"""
+
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[Tuple[str, bytes]]" = queue.Queue(maxsize=MAX_PENDING_WRITES)
+        self._files: "OrderedDict[str, IO[bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def put(self, path: str, data: bytes) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._drain, name="gsa-log-writer", daemon=True)
+                    self._thread.start()
+        self._queue.put((path, data))
+
+    def flush(self) -> None:
+        """等待已提交的事件全部落盘。"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _file(self, path: str) -> IO[bytes]:
+        f = self._files.get(path)
+        if f is None:
+            f = self._files[path] = open(path, "ab", buffering=64 * 1024)
+            while len(self._files) > MAX_OPEN_FILES:
+                self._files.popitem(last=False)[1].close()
+        else:
+            self._files.move_to_end(path)
+        return f
+
+    def _drain(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < MAX_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            grouped: Dict[str, List[bytes]] = {}
+            for path, data in batch:
+                grouped.setdefault(path, []).append(data)
+            for path, chunks in grouped.items():
+                try:
+                    f = self._file(path)
+                    f.write(b"".join(chunks))
+                    f.flush()
+                except OSError:
+                    # 日志目录被删除等情况：丢掉句柄，下次重新打开
+                    stale = self._files.pop(path, None)
+                    if stale is not None:
+                        stale.close()
+            for _ in batch:
+                self._queue.task_done()
+
+
+_WRITER = _LogWriter()
+atexit.register(_WRITER.flush)
+
+# 秒级时间戳缓存：同一秒内的事件复用已格式化的字节
+_ts_second = -1
+_ts_bytes = b""
+# 事件类型取值有限，编码结果按名字缓存
+_EVENT_KEYS: Dict[str, bytes] = {}
+
+
+def _timestamp() -> bytes:
+    global _ts_second, _ts_bytes
+    now = int(time.time())
+    if now != _ts_second:
+        _ts_bytes = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now)).encode()
+        _ts_second = now
+    return _ts_bytes
+
+
+def _event_key(event_type: str) -> bytes:
+    key = _EVENT_KEYS.get(event_type)
+    if key is None:
+        key = _EVENT_KEYS[event_type] = b'","event":' + jsonio.dumps(event_type) + b","
+    return key
 
 
 class EventLogger:
-    """JSONL 事件日志。"""
+    """JSONL 事件日志（后台线程批量写入，log() 不等待磁盘）。"""
 
     def __init__(self, workspace: str, trace_id: str):
         self.workspace = workspace
@@ -16,13 +112,25 @@ class EventLogger:
         os.makedirs(self.log_dir, exist_ok=True)
         date = datetime.now().strftime("%Y%m%d")
         self.path = os.path.join(self.log_dir, f"{date}_{trace_id}.jsonl")
+        # 每条记录中不变的片段，只编码一次
+        self._trace_prefix = b'"trace_id":' + jsonio.dumps(trace_id) + b',"payload":'
+
+    def _encode(self, event_type: str, payload: Dict[str, Any]) -> bytes:
+        # 字段顺序与原先 dict 序列化一致：time, event, trace_id, payload
+        return b"".join((
+            b'{"time":"', _timestamp(), _event_key(event_type),
+            self._trace_prefix, jsonio.dumps(payload), b"}\n",
+        ))
 
     def log(self, event_type: str, payload: Dict[str, Any]) -> None:
-        record = {
-            "time": datetime.now().isoformat(timespec="seconds"),
-            "event": event_type,
-            "trace_id": self.trace_id,
-            "payload": payload,
-        }
-        with open(self.path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        _WRITER.put(self.path, self._encode(event_type, payload))
+
+    def log_batch(self, events: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """多条事件合并为一次提交。"""
+        data = b"".join(self._encode(event_type, payload) for event_type, payload in events)
+        if data:
+            _WRITER.put(self.path, data)
+
+    def flush(self) -> None:
+        """等待已记录的事件写入文件，读取日志前调用。"""
+        _WRITER.flush()
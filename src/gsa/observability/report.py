@@ -1,25 +1,28 @@
 from __future__ import annotations
 
-import json
 import os
 from datetime import datetime
 from typing import Any, Dict, List
 
+from gsa import jsonio
 
-def write_run_report(workspace: str, trace_id: str, summary: str, steps: List[Dict[str, Any]]) -> None:
-    os.makedirs(os.path.join(workspace, ".gsa"), exist_ok=True)
-    changes_path = os.path.join(workspace, ".gsa", "changes.md")
-    with open(changes_path, "w", encoding="utf-8") as f:
-        f.write(f"# 本次执行摘要\n\n")
-        f.write(f"- trace_id: {trace_id}\n")
-        f.write(f"- 时间: {datetime.now().isoformat(timespec='seconds')}\n\n")
-        f.write(summary + "\n")
 
-    last_run_path = os.path.join(workspace, ".gsa", "last_run_summary.json")
-    with open(last_run_path, "w", encoding="utf-8") as f:
-        json.dump({
-            "trace_id": trace_id,
-            "summary": summary,
-            "steps": steps,
-            "time": datetime.now().isoformat(timespec="seconds"),
-        }, f, ensure_ascii=False, indent=2)
+def _write_bytes(path: str, data: bytes) -> None:
+    # 一次性小文件：直接 os.write，不经过缓冲文件对象
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def write_run_report(workspace: str, trace_id: str, summary: str, steps: List[Dict[str, Any]]) -> None:
+    gsa_dir = os.path.join(workspace, ".gsa")
+    os.makedirs(gsa_dir, exist_ok=True)
+    now = datetime.now().isoformat(timespec="seconds")
+    changes = f"# 本次执行摘要\n\n- trace_id: {trace_id}\n- 时间: {now}\n\n{summary}\n"
+    _write_bytes(os.path.join(gsa_dir, "changes.md"), changes.encode("utf-8"))
+    payload = {"trace_id": trace_id, "summary": summary, "steps": steps, "time": now}
+    _write_bytes(os.path.join(gsa_dir, "last_run_summary.json"), jsonio.dumps(payload, indent=True))
@@ -1,5 +1,6 @@
-import uuid
+import secrets
 
 
 def new_trace_id() -> str:
-    return uuid.uuid4().hex
+    # 与 uuid4().hex 同为 32 位十六进制，但只需一次取随机数
+    return secrets.token_hex(16)
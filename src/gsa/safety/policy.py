@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+import re
 from typing import Iterable, List, Tuple
 
 BLOCKED_GIT_ARGS = {
@@ -11,6 +12,9 @@ BLOCKED_GIT_ARGS = {
     "checkout -- .",
 }
 
+# 所有危险参数合成一个交替式，一次 search 完成检查；长的在前，重叠时报告更具体的那条
+_BLOCKED_RE = re.compile("|".join(re.escape(b) for b in sorted(BLOCKED_GIT_ARGS, key=len, reverse=True)))
+
 SENSITIVE_NAMES = {
     ".env",
     ".env.local",
@@ -31,7 +35,11 @@ def realpath(path: str) -> str:
 
 def ensure_in_workspace(workspace: str, target: str) -> str:
     """确保路径不逃逸 workspace。"""
-    root = realpath(workspace)
+    return ensure_in_root(realpath(workspace), target)
+
+
+def ensure_in_root(root: str, target: str) -> str:
+    """同 ensure_in_workspace，但 root 已由调用方 realpath 过，可在多次调用间复用。"""
     target_path = realpath(os.path.join(root, target)) if not os.path.isabs(target) else realpath(target)
     if not target_path.startswith(root + os.sep) and target_path != root:
         raise PolicyError(f"路径越界：{target}")
@@ -45,10 +53,9 @@ def deny_if_sensitive(path: str) -> None:
 
 
 def validate_git_args(args: Iterable[str]) -> None:
-    joined = " ".join(args)
-    for blocked in BLOCKED_GIT_ARGS:
-        if blocked in joined:
-            raise PolicyError(f"禁止危险 git 操作：{blocked}")
+    match = _BLOCKED_RE.search(" ".join(args))
+    if match:
+        raise PolicyError(f"禁止危险 git 操作：{match.group()}")
 
 
 def limit_write_steps(total_steps: int) -> None:
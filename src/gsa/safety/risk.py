@@ -1,16 +1,20 @@
 from __future__ import annotations
 
-from typing import Dict, Tuple
+from types import MappingProxyType
+from typing import Callable, Dict, Mapping, Optional, Tuple
 
+Risk = Tuple[str, str]
 
-RISK_MAP = {
+RISK_MAP: Mapping[str, Risk] = MappingProxyType({
     "git_status": ("low", "只读操作"),
     "git_diff": ("low", "只读操作"),
     "git_log": ("low", "只读操作"),
     "git_branch_list": ("low", "只读操作"),
     "git_remote_list": ("low", "只读操作"),
     "git_show": ("low", "只读操作"),
+    "git_cat_file": ("low", "只读操作"),
     "git_log_graph": ("low", "只读操作"),
+    "repo_snapshot": ("low", "只读操作"),
     "file_list": ("low", "只读操作"),
     "file_read": ("low", "只读操作"),
     "file_search": ("low", "只读操作"),
@@ -31,21 +35,48 @@ RISK_MAP = {
     "git_merge": ("high", "合并可能引发冲突"),
     "file_write": ("high", "写入文件"),
     "file_patch": ("high", "修改文件"),
-}
+})
 
+def _delete_branch_risk(args: Dict[str, object]) -> Optional[Risk]:
+    if args.get("force"):
+        return "high", "强制删除分支，风险更高"
+    return None
 
-def assess_risk(tool: str, args: Dict[str, object]) -> Tuple[str, str]:
+
+def _switch_risk(args: Dict[str, object]) -> Optional[Risk]:
+    if args.get("create"):
+        return "medium", "创建并切换分支"
+    return None
+
+
+def _file_change_risk(args: Dict[str, object]) -> Optional[Risk]:
+    path = args.get("path")
+    if path:
+        return "high", f"写入/修改文件 {path}"
+    return None
+
+
+# 风险随参数变化的工具：返回 None 时沿用 RISK_MAP 中的默认值
+_OVERRIDES: Mapping[str, Callable[[Dict[str, object]], Optional[Risk]]] = MappingProxyType(
+    {
+        "git_delete_branch": _delete_branch_risk,
+        "git_switch": _switch_risk,
+        "file_write": _file_change_risk,
+        "file_patch": _file_change_risk,
+    }
+)
+
+# 风险等级不随参数变化的工具，可直接查表
+STATIC_RISK: Mapping[str, Risk] = MappingProxyType(
+    {tool: risk for tool, risk in RISK_MAP.items() if tool not in _OVERRIDES}
+)
+
+
+def assess_risk(tool: str, args: Dict[str, object]) -> Risk:
     base = RISK_MAP.get(tool)
-    if not base:
+    if base is None:
         return "medium", "未知工具，默认中风险"
-
-    level, reason = base
-    if tool == "git_delete_branch":
-        if bool(args.get("force")):
-            return "high", "强制删除分支，风险更高"
-    if tool == "git_switch":
-        if args.get("create"):
-            return "medium", "创建并切换分支"
-    if tool in {"file_write", "file_patch"} and args.get("path"):
-        return "high", f"写入/修改文件 {args.get('path')}"
-    return level, reason
+    override = _OVERRIDES.get(tool)
+    if override is None:
+        return base
+    return override(args) or base
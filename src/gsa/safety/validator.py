@@ -1,24 +1,28 @@
 from __future__ import annotations
 
-from typing import Iterable, List, Set
+from collections.abc import Set
+from typing import AbstractSet, Iterable, List
 
 from gsa.agent.schema import Plan
 from gsa.safety.policy import limit_write_steps
 
 
-WRITE_TOOLS = {
-    "git_init",
-    "git_add",
-    "git_commit",
-    "git_switch",
-    "git_create_branch",
-    "git_delete_branch",
-    "git_stash_push",
-    "git_stash_pop",
-    "git_merge",
-    "file_write",
-    "file_patch",
-}
+WRITE_TOOLS = frozenset(
+    {
+        "git_init",
+        "git_add",
+        "git_commit",
+        "git_switch",
+        "git_create_branch",
+        "git_delete_branch",
+        "git_stash_push",
+        "git_stash_pop",
+        "git_merge",
+        "file_write",
+        "file_patch",
+    }
+)
+_WRITE_LEVELS = frozenset({"medium", "high"})
 
 
 class PlanValidationError(ValueError):
@@ -27,27 +31,35 @@ class PlanValidationError(ValueError):
 
 def validate_plan(plan: Plan, registered_tools: Iterable[str]) -> List[str]:
     errors: List[str] = []
-    tools: Set[str] = set(registered_tools)
+    # 调用方可直接传入缓存的集合，避免每次重建
+    tools: AbstractSet[str] = (
+        registered_tools if isinstance(registered_tools, Set) else frozenset(registered_tools)
+    )
 
     if not plan.steps and not plan.questions:
         errors.append("steps 为空时必须提供 questions")
 
+    # 单次遍历：未注册工具的错误立即记录，写操作的错误先收集，最后按原有顺序拼接
+    write_count = 0
+    write_errors: List[str] = []
     for step in plan.steps:
-        if step.tool not in tools:
-            errors.append(f"未注册工具：{step.tool}")
+        tool = step.tool
+        if tool not in tools:
+            errors.append(f"未注册工具：{tool}")
+        if tool in WRITE_TOOLS:
+            write_count += 1
+            if step.safety_level not in _WRITE_LEVELS:
+                write_errors.append(f"写操作风险等级必须为 medium/high：{tool}")
+            if not step.safety_reason:
+                write_errors.append(f"写操作缺少安全原因：{tool}")
 
-    write_steps = [s for s in plan.steps if s.tool in WRITE_TOOLS]
-    if write_steps:
+    if write_count:
         try:
-            limit_write_steps(len(write_steps))
+            limit_write_steps(write_count)
         except Exception as exc:
             errors.append(str(exc))
         if not plan.needs_confirmation:
             errors.append("存在写操作但 needs_confirmation=false")
-        for s in write_steps:
-            if s.safety_level not in {"medium", "high"}:
-                errors.append(f"写操作风险等级必须为 medium/high：{s.tool}")
-            if not s.safety_reason:
-                errors.append(f"写操作缺少安全原因：{s.tool}")
+        errors.extend(write_errors)
 
     return errors
@@ -1,10 +1,28 @@
 from __future__ import annotations
 
 import difflib
+import mmap
 import os
-from typing import Dict, List
+import base64
+import re
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
 
-from gsa.safety.policy import PolicyError, deny_if_sensitive, ensure_in_workspace
+from gsa import jsonio
+from gsa.safety.policy import SENSITIVE_NAMES, PolicyError, deny_if_sensitive, ensure_in_root, realpath
+
+# 文件开头出现 NUL 字节即视为二进制
+BINARY_SNIFF_BYTES = 8192
+# 超过该字符数的写入不再计算 unified diff
+MAX_DIFF_CHARS = 1_000_000
+# unified diff 的 hunk 头：@@ -起始,行数 +起始,行数 @@
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+# 搜索时每个线程任务依次扫描的文件数
+SEARCH_BATCH_FILES = 32
 
 
 class FileTool:
@@ -12,24 +30,46 @@ class FileTool:
 
     def __init__(self, workspace: str):
         self.workspace = workspace
+        # 工作区根目录只解析一次，每次路径检查不再逐级 lstat
+        self._root = realpath(workspace)
+        # 有 ripgrep 时 search 优先交给它；启动时探测一次
+        self._rg = shutil.which("rg")
 
     def _safe_path(self, path: str) -> str:
-        target = ensure_in_workspace(self.workspace, path)
+        target = ensure_in_root(self._root, path)
         deny_if_sensitive(target)
         return target
 
     def list_dir(self, dir: str = ".", max_depth: int = 2, dry_run: bool = True) -> Dict[str, object]:
         root = self._safe_path(dir)
         result: List[str] = []
-        for current, dirs, files in os.walk(root):
-            depth = os.path.relpath(current, root).count(os.sep)
-            if depth > max_depth:
-                dirs[:] = []
+        if max_depth < 0:
+            return {"ok": True, "items": result}
+        # 显式栈做先序遍历，输出顺序与 os.walk 一致；超出深度的目录不再 scandir。
+        # 深度沿用原先 relpath(...).count(os.sep) 的算法：根目录与其直接子目录都记为 0。
+        stack: List[Tuple[str, str, int]] = [(".", root, 0)]
+        while stack:
+            rel, current, parts = stack.pop()
+            files: List[str] = []
+            subdirs: List[Tuple[str, str, int]] = []
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        try:
+                            is_dir = entry.is_dir()
+                        except OSError:
+                            is_dir = False
+                        if not is_dir:
+                            files.append(os.path.join(rel, entry.name))
+                        elif parts <= max_depth and not entry.is_symlink():
+                            # 子目录的深度恰为当前目录的层数 parts
+                            child = entry.name if rel == "." else os.path.join(rel, entry.name)
+                            subdirs.append((child, entry.path, parts + 1))
+            except OSError:
                 continue
-            rel = os.path.relpath(current, root)
             result.append(f"{rel}/")
-            for name in files:
-                result.append(os.path.join(rel, name))
+            result.extend(files)
+            stack.extend(reversed(subdirs))
         return {"ok": True, "items": result}
 
     def summary(self) -> Dict[str, object]:
@@ -41,26 +81,26 @@ class FileTool:
         if not os.path.exists(target):
             return {"ok": False, "error": "文件不存在"}
         with open(target, "r", encoding="utf-8", errors="ignore") as f:
-            content = f.read()
+            # 只多读一个字符用来判断是否截断，大文件不必整个读进内存
+            content = f.read(max_chars + 1)
         if len(content) > max_chars:
             content = content[:max_chars] + "\n...<内容截断>"
         return {"ok": True, "content": content}
 
-    def write(self, path: str, content: str, dry_run: bool = True) -> Dict[str, object]:
+    def write(self, path: str, content: str, dry_run: bool = True, include_diff: bool = True) -> Dict[str, object]:
         target = self._safe_path(path)
         old = ""
-        if os.path.exists(target):
+        exists = os.path.exists(target)
+        if exists:
             with open(target, "r", encoding="utf-8", errors="ignore") as f:
                 old = f.read()
-        diff = "\n".join(
-            difflib.unified_diff(
-                old.splitlines(),
-                content.splitlines(),
-                fromfile=path,
-                tofile=path,
-                lineterm="",
-            )
-        )
+        # 新建空文件（如 __init__.py）时 old 同为 ""，不能当作未变化
+        if exists and old == content:
+            # 内容未变化：不计算 diff，也不重写文件
+            if dry_run:
+                return {"ok": True, "dry_run": True, "diff": ""}
+            return {"ok": True, "diff": "", "unchanged": True}
+        diff = _write_diff(path, old, content) if include_diff else ""
         if dry_run:
             return {"ok": True, "dry_run": True, "diff": diff}
         os.makedirs(os.path.dirname(target), exist_ok=True)
@@ -72,46 +112,285 @@ class FileTool:
         target = self._safe_path(path)
         if not os.path.exists(target):
             return {"ok": False, "error": "文件不存在"}
-        with open(target, "r", encoding="utf-8", errors="ignore") as f:
-            old = f.read()
-        # 简单应用：仅支持整文件替换型 diff
         if not unified_diff:
             return {"ok": False, "error": "diff 为空"}
         if dry_run:
             return {"ok": True, "dry_run": True, "diff": unified_diff}
-        # 使用系统 patch 应用 unified diff，失败则拒绝
-        import subprocess
-
-        proc = subprocess.run(
-            ["patch", "-p0", target],
-            input=unified_diff,
-            text=True,
-            capture_output=True,
-        )
-        if proc.returncode != 0:
-            return {"ok": False, "error": "diff 无法应用", "stderr": proc.stderr}
-        return {"ok": True, "diff": unified_diff, "stdout": proc.stdout}
+        try:
+            # newline="" 保留原有换行符，按原样比对与写回
+            with open(target, "r", encoding="utf-8", newline="") as f:
+                new = _apply_unified_diff(f.read(), unified_diff)
+        except (UnicodeDecodeError, ValueError):
+            # 进程内无法精确应用（非 UTF-8、上下文偏移等）时交给系统 patch，失败则拒绝
+            proc = subprocess.run(
+                ["patch", "-p0", target],
+                input=unified_diff,
+                text=True,
+                capture_output=True,
+            )
+            if proc.returncode != 0:
+                return {"ok": False, "error": "diff 无法应用", "stderr": proc.stderr}
+            return {"ok": True, "diff": unified_diff, "stdout": proc.stdout}
+        with open(target, "w", encoding="utf-8", newline="") as f:
+            f.write(new)
+        return {"ok": True, "diff": unified_diff, "stdout": ""}
 
     def search(self, pattern: str, dir: str = ".", max_results: int = 50, dry_run: bool = True) -> Dict[str, object]:
         root = self._safe_path(dir)
+        if self._rg:
+            try:
+                return self._search_rg(root, pattern, max_results)
+            except OSError:
+                pass  # rg 无法启动时退回进程内扫描
+        needle = pattern.encode("utf-8")
+        stop = threading.Event()
+
+        def scan(paths: List[str]) -> List[Dict[str, object]]:
+            found: List[Dict[str, object]] = []
+            for path in paths:
+                if stop.is_set() or len(found) >= max_results:
+                    break
+                rel = os.path.relpath(path, root)
+                try:
+                    for line_no, text in _scan_file(path, needle):
+                        found.append({"file": rel, "line": line_no, "text": text})
+                        if len(found) >= max_results:
+                            break
+                except Exception:
+                    continue
+            return found
+
         hits: List[Dict[str, object]] = []
-        for current, _, files in os.walk(root):
-            for name in files:
-                path = os.path.join(current, name)
+        workers = min(32, (os.cpu_count() or 1) * 4)
+        batches = _batched(self._search_paths(root), SEARCH_BATCH_FILES)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # 边遍历边提交：每轮 workers 批文件并行扫描，按遍历顺序合并，凑够结果即停止
+            while True:
+                window = list(islice(batches, workers))
+                if not window:
+                    break
+                for found in pool.map(scan, window):
+                    hits.extend(found)
+                    if len(hits) >= max_results:
+                        stop.set()
+                        return {"ok": True, "hits": hits[:max_results]}
+        return {"ok": True, "hits": hits}
+
+    def _search_rg(self, root: str, pattern: str, max_results: int) -> Dict[str, object]:
+        # 与进程内扫描保持一致：按字面量匹配，不跳过隐藏文件和 .gitignore 中的文件；
+        # 按路径排序输出，max_results 截断得到的子集才稳定（排序时 rg 改为单线程遍历）
+        cmd = [
+            self._rg, "--json", "--fixed-strings", "--hidden", "--no-ignore", "--no-messages", "--sort", "path",
+            "--", pattern, ".",
+        ]
+        proc = subprocess.Popen(cmd, cwd=root, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        hits: List[Dict[str, object]] = []
+        pending: List[Dict[str, object]] = []  # 当前文件的命中，文件结束时确认不是二进制才计入
+        try:
+            for raw in proc.stdout:
+                if raw.startswith(b'{"type":"end"'):
+                    # rg 在遇到 NUL 时停止搜索并给出 binary_offset；与进程内扫描一致，整个文件不计入
+                    if jsonio.loads(raw)["data"].get("binary_offset") is None:
+                        hits.extend(pending)
+                    pending = []
+                    if len(hits) >= max_results:
+                        break
+                    continue
+                if not raw.startswith(b'{"type":"match"'):
+                    continue
+                data = jsonio.loads(raw)["data"]
+                path = _rg_text(data["path"])
                 try:
                     deny_if_sensitive(path)
-                    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                        for idx, line in enumerate(f):
-                            if pattern in line:
-                                hits.append({
-                                    "file": os.path.relpath(path, root),
-                                    "line": idx + 1,
-                                    "text": line.strip(),
-                                })
-                                if len(hits) >= max_results:
-                                    return {"ok": True, "hits": hits}
                 except PolicyError:
                     continue
-                except Exception:
-                    continue
-        return {"ok": True, "hits": hits}
+                pending.append(
+                    {"file": os.path.normpath(path), "line": data["line_number"], "text": _rg_text(data["lines"]).strip()}
+                )
+        finally:
+            # 凑够结果后不必等 rg 扫完整个工作区
+            if proc.poll() is None:
+                proc.kill()
+            proc.stdout.close()
+            proc.wait()
+        return {"ok": True, "hits": hits[:max_results]}
+
+    @staticmethod
+    def _search_paths(root: str) -> Iterator[str]:
+        """与 rg --sort path 顺序一致：同一目录内文件与子目录按名称统一排序，深度优先，不跟随符号链接。"""
+        try:
+            with os.scandir(root) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            return
+        for entry in entries:
+            if entry.is_symlink():
+                continue
+            if entry.is_dir():
+                yield from FileTool._search_paths(entry.path)
+            # 与 deny_if_sensitive 等价：遍历已给出文件名，直接查集合
+            elif entry.name not in SENSITIVE_NAMES:
+                yield entry.path
+
+
+def _rg_text(field: Dict[str, str]) -> str:
+    # rg --json 对非 UTF-8 内容给出 base64 编码的 bytes 字段
+    if "text" in field:
+        return field["text"]
+    return base64.b64decode(field["bytes"]).decode("utf-8", errors="ignore")
+
+
+def _write_diff(path: str, old: str, new: str) -> str:
+    if max(len(old), len(new)) >= MAX_DIFF_CHARS:
+        # difflib 在大文件上耗时很长，只给出大小变化
+        return f"<文件过大，未生成 diff：{len(old)} -> {len(new)} 字符>"
+    return "\n".join(
+        difflib.unified_diff(
+            old.splitlines(),
+            new.splitlines(),
+            fromfile=path,
+            tofile=path,
+            lineterm="",
+        )
+    )
+
+
+def _parse_hunks(diff: str) -> List[Tuple[int, List[str], List[str]]]:
+    """解析单文件 unified diff，返回 [(旧文件起始行, 旧行, 新行)]。"""
+    hunks: List[Tuple[int, List[str], List[str]]] = []
+    lines = _split_lines(diff)
+    i = 0
+    while i < len(lines):
+        m = _HUNK_RE.match(lines[i])
+        i += 1
+        if not m:
+            if hunks and lines[i - 1].startswith("--- "):
+                raise ValueError("不支持多文件 diff")
+            continue  # 文件头等 hunk 之外的行
+        old_left = int(m.group(2) or 1)
+        new_left = int(m.group(4) or 1)
+        before: List[str] = []
+        after: List[str] = []
+        last = ""
+        while i < len(lines) and (old_left or new_left or lines[i].startswith("\\")):
+            line = lines[i]
+            i += 1
+            tag, text = line[:1], line[1:]
+            if tag == "\\":
+                # "\ No newline at end of file"：去掉上一行的换行符
+                if last in (" ", "-"):
+                    before[-1] = before[-1].rstrip("\r\n")
+                if last in (" ", "+"):
+                    after[-1] = after[-1].rstrip("\r\n")
+                continue
+            if tag in ("\n", "\r"):
+                # 部分工具会把空上下文行的前导空格去掉
+                tag, text = " ", line
+            if tag == " ":
+                before.append(text)
+                after.append(text)
+                old_left -= 1
+                new_left -= 1
+                last = " "
+            elif tag == "-":
+                before.append(text)
+                old_left -= 1
+                last = "-"
+            elif tag == "+":
+                after.append(text)
+                new_left -= 1
+                last = "+"
+            else:
+                raise ValueError(f"无法解析的 diff 行：{line!r}")
+        if old_left or new_left:
+            raise ValueError("hunk 行数与头部不符")
+        hunks.append((int(m.group(1)), before, after))
+    if not hunks:
+        raise ValueError("diff 中没有 hunk")
+    return hunks
+
+
+def _apply_unified_diff(old: str, diff: str) -> str:
+    """按 fuzz 0 精确应用 unified diff；上下文对不上时抛 ValueError。"""
+    lines = _split_lines(old)
+    out: List[str] = []
+    pos = 0  # lines 中已拷贝到 out 的位置
+    offset = 0  # 前面 hunk 实际位置与声明位置之差
+    for start, before, after in _parse_hunks(diff):
+        # 旧侧行数为 0 时，起始行表示“在该行之后插入”
+        declared = start - 1 if before else start
+        at = _locate(lines, before, declared + offset, pos)
+        out.extend(lines[pos:at])
+        out.extend(after)
+        pos = at + len(before)
+        offset = at - declared
+    out.extend(lines[pos:])
+    return "".join(out)
+
+
+def _split_lines(text: str) -> List[str]:
+    """只按换行符切分并保留行尾；str.splitlines 还会在换页符、U+2028 等处切开。"""
+    parts = text.split("\n")
+    lines = [part + "\n" for part in parts[:-1]]
+    if parts[-1]:
+        lines.append(parts[-1])
+    return lines
+
+
+def _locate(lines: List[str], block: List[str], expected: int, lo: int) -> int:
+    """从 expected 向两侧查找 block 完全匹配的位置，不早于 lo。"""
+    n = len(block)
+    hi = len(lines) - n
+    for delta in range(max(expected - lo, hi - expected, 0) + 1):
+        for at in (expected - delta, expected + delta):
+            if lo <= at <= hi and lines[at : at + n] == block:
+                return at
+    raise ValueError("diff 上下文与文件内容不符")
+
+
+def _batched(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    batch: List[str] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _scan_file(path: str, needle: bytes) -> Iterator[Tuple[int, str]]:
+    """在文件字节上直接查找 needle，逐个产出 (行号, 去首尾空白的行文本)。"""
+    with open(path, "rb") as f:
+        head = f.read(BINARY_SNIFF_BYTES)
+        if b"\0" in head:
+            return  # 二进制文件不参与搜索
+        if len(head) < BINARY_SNIFF_BYTES:
+            # 小文件已整个读入，不必再 mmap
+            yield from _scan_buffer(head, len(head), needle)
+            return
+        size = os.fstat(f.fileno()).st_size
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # 开头之后才出现 NUL 也视为二进制，整个文件跳过（与 rg 路径一致）
+            if mm.find(b"\0", len(head)) >= 0:
+                return
+            yield from _scan_buffer(mm, size, needle)
+
+
+def _scan_buffer(buf: Union[bytes, mmap.mmap], size: int, needle: bytes) -> Iterator[Tuple[int, str]]:
+    pos = 0
+    line_no = 1
+    counted = 0  # 已统计换行符的位置
+    while pos < size:
+        hit = buf.find(needle, pos)
+        if hit < 0:
+            return
+        start = buf.rfind(b"\n", 0, hit) + 1
+        end = buf.find(b"\n", hit)
+        if end < 0:
+            end = size
+        line_no += buf[counted:start].count(b"\n")
+        counted = start
+        yield line_no, buf[start:end].decode("utf-8", errors="ignore").strip()
+        # 同一行只计一次命中
+        pos = end + 1
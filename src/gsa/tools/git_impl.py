@@ -1,9 +1,47 @@
 from __future__ import annotations
 
+import os
+import re
 import subprocess
-from typing import Dict, List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import weakref
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from gsa.safety.policy import PolicyError, validate_git_args
+from gsa.safety.policy import PolicyError, deny_if_sensitive, validate_git_args
+
+# git show 最多返回的字符数
+SHOW_MAX_CHARS = 4000
+# cat-file 原样返回内容的对象类型；tree 为二进制条目，单独处理
+_TEXT_OBJECT_TYPES = frozenset({"blob", "commit", "tag"})
+# snapshot 可合并查询的只读分段
+SNAPSHOT_SECTIONS = {
+    "status": ["status", "-sb"],
+    "branch": ["branch", "-a"],
+    "log": ["log", "-10", "--pretty=format:%h|%an|%ad|%s", "--date=short"],
+    "remote": ["remote", "-v"],
+}
+
+
+def _stop(proc: subprocess.Popen) -> None:
+    if proc.poll() is None:
+        proc.kill()
+    proc.wait()
+
+
+def _decode(data: bytes) -> str:
+    # git 输出按 UTF-8 解码；个别非法字节替换掉，不因区域设置不同而报错
+    return data.decode("utf-8", errors="replace")
+
+
+def _object_path(ref: str) -> Optional[str]:
+    """取出对象名中的文件路径：<rev>:<path>、:<path> 或 :<N>:<path>；不含路径时返回 None。"""
+    if ":" not in ref:
+        return None
+    stage = re.match(r":[0-3]:", ref)
+    if stage:
+        return ref[stage.end() :]
+    return ref.split(":", 1)[1]
 
 
 class GitTool:
@@ -11,19 +49,70 @@ class GitTool:
 
     def __init__(self, workspace: str):
         self.workspace = workspace
+        # 只缓存"是仓库"的结论；否则工作区可能随后在外部被 git init
+        self._is_repo = False
+        # 只读查询不抢 .git/index.lock（git status 默认会顺手刷新索引）
+        self._env = {**os.environ, "GIT_OPTIONAL_LOCKS": "0"}
+        # 常驻的 git cat-file --batch 进程，首次 cat_object 时启动
+        self._cat_proc: Optional[subprocess.Popen] = None
+        self._cat_finalizer: Optional[weakref.finalize] = None
+        self._cat_lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._cat_lock:
+            if self._cat_proc is not None:
+                _stop(self._cat_proc)
+                self._cat_proc = None
+
+    def _cat_file(self) -> subprocess.Popen:
+        proc = self._cat_proc
+        if proc is None or proc.poll() is not None:
+            proc = subprocess.Popen(
+                ["git", "-C", self.workspace, "cat-file", "--batch"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                env=self._env,
+            )
+            # 实例被回收时一并结束子进程；重启时换掉旧进程的回收钩子，避免钩子随重启累积
+            if self._cat_finalizer is not None:
+                self._cat_finalizer.detach()
+            self._cat_finalizer = weakref.finalize(self, _stop, proc)
+            self._cat_proc = proc
+        return proc
 
     def _run(self, args: List[str]) -> subprocess.CompletedProcess:
         validate_git_args(args)
-        return subprocess.run(
+        # 以字节方式读取，再统一解码，省去文本模式的包装层
+        proc = subprocess.run(["git", "-C", self.workspace] + args, capture_output=True, env=self._env)
+        return subprocess.CompletedProcess(proc.args, proc.returncode, _decode(proc.stdout), _decode(proc.stderr))
+
+    def _run_capped(self, args: List[str], max_chars: int) -> Tuple[int, str, str, bool]:
+        """只读取 max_chars 个字符的 stdout，超出即结束 git，返回 (退出码, stdout, stderr, 是否截断)。"""
+        validate_git_args(args)
+        proc = subprocess.Popen(
             ["git", "-C", self.workspace] + args,
-            capture_output=True,
-            text=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            encoding="utf-8",
+            errors="replace",
+            env=self._env,
         )
+        out = proc.stdout.read(max_chars + 1)
+        truncated = len(out) > max_chars
+        if truncated:
+            proc.kill()
+        _, err = proc.communicate()
+        # 被主动结束时退出码非 0，但已读到的输出是有效的
+        return (0 if truncated else proc.returncode), out[:max_chars], err, truncated
 
     def _ensure_repo(self) -> Optional[str]:
+        if self._is_repo:
+            return None
         proc = self._run(["rev-parse", "--is-inside-work-tree"])
         if proc.returncode != 0:
             return proc.stderr.strip() or "当前目录不是 git 仓库"
+        self._is_repo = True
         return None
 
     # 只读
@@ -107,19 +196,92 @@ class GitTool:
         err = self._ensure_repo()
         if err:
             return {"ok": False, "error": err}
-        proc = self._run(["show", "--stat", "--oneline", ref])
-        out = proc.stdout
-        if len(out) > 4000:
-            out = out[:4000] + "\n...<输出截断>"
-        return {"ok": proc.returncode == 0, "stdout": out, "stderr": proc.stderr}
+        code, out, err, truncated = self._run_capped(["show", "--stat", "--oneline", ref], SHOW_MAX_CHARS)
+        if truncated:
+            out += "\n...<输出截断>"
+        return {"ok": code == 0, "stdout": out, "stderr": err}
+
+    def cat_object(self, ref: str = "HEAD", dry_run: bool = True) -> Dict[str, object]:
+        """经常驻的 cat-file 进程读取对象原始内容，省去每次调用的进程启动。"""
+        err = self._ensure_repo()
+        if err:
+            return {"ok": False, "error": err}
+        if not ref or "\n" in ref:
+            return {"ok": False, "error": "非法对象名"}
+        # <rev>:<path> 与 :[N:]<path>（索引/暂存阶段）可直接读出文件内容，同样拒绝敏感文件
+        path = _object_path(ref)
+        if path is not None:
+            try:
+                deny_if_sensitive(path)
+            except PolicyError as exc:
+                return {"ok": False, "error": str(exc)}
+        with self._cat_lock:
+            proc = self._cat_file()
+            try:
+                proc.stdin.write(ref.encode("utf-8") + b"\n")
+                proc.stdin.flush()
+                line = proc.stdout.readline().rstrip(b"\n")
+                # "<ref> missing" / "<ref> ambiguous"：ref 本身可能含空格，只看行尾
+                if line.endswith((b" missing", b" ambiguous")):
+                    return {"ok": False, "error": f"对象不存在：{ref}"}
+                sha, obj_type, size = line.decode().split(" ")
+                size = int(size)
+                data = proc.stdout.read(min(size, SHOW_MAX_CHARS))
+                # 超出上限的部分必须读掉，否则后续请求会错位
+                left = size - len(data) + 1
+                while left > 0:
+                    chunk = proc.stdout.read(min(left, 65536))
+                    if not chunk:
+                        break
+                    left -= len(chunk)
+            except (OSError, ValueError):
+                _stop(proc)
+                self._cat_proc = None
+                return {"ok": False, "error": "git cat-file 进程异常"}
+        if obj_type == "blob" and path is None:
+            # 按 SHA 等形式读 blob 时无从得知文件名，无法做敏感文件检查
+            return {"ok": False, "error": "读取文件内容请使用 <rev>:<path> 形式"}
+        if obj_type == "tree":
+            # 树对象的原始内容是二进制条目，改用 ls-tree 输出可读列表
+            code, out, stderr, truncated = self._run_capped(["ls-tree", sha], SHOW_MAX_CHARS)
+            if code != 0:
+                return {"ok": False, "error": stderr.strip() or "git ls-tree 失败"}
+        elif obj_type in _TEXT_OBJECT_TYPES:
+            out, truncated = _decode(data), size > SHOW_MAX_CHARS
+        else:
+            return {"ok": False, "error": f"不支持的对象类型：{obj_type}"}
+        if truncated:
+            out += "\n...<输出截断>"
+        return {"ok": True, "sha": sha, "type": obj_type, "size": size, "stdout": out}
+
+    def snapshot(self, include: Optional[Sequence[str]] = None, dry_run: bool = True) -> Dict[str, object]:
+        """一次调用执行多条只读 git 查询，按分段返回。"""
+        err = self._ensure_repo()
+        if err:
+            return {"ok": False, "error": err}
+        names = list(include or ("status", "branch", "log"))
+        unknown = [name for name in names if name not in SNAPSHOT_SECTIONS]
+        if unknown:
+            return {"ok": False, "error": f"未知分段：{', '.join(unknown)}"}
+        # 各分段互不依赖，并发执行；GIT_OPTIONAL_LOCKS=0 下只读命令不会争抢索引锁
+        with ThreadPoolExecutor(max_workers=len(names)) as pool:
+            procs = list(pool.map(self._run, [SNAPSHOT_SECTIONS[name] for name in names]))
+        sections = {
+            name: {"ok": proc.returncode == 0, "stdout": proc.stdout} for name, proc in zip(names, procs)
+        }
+        return {
+            "ok": all(section["ok"] for section in sections.values()),
+            "sections": sections,
+            "stderr": "".join(proc.stderr for proc in procs),
+        }
 
     def init_repo(self, dry_run: bool = True) -> Dict[str, object]:
-        proc = self._run(["rev-parse", "--is-inside-work-tree"])
-        if proc.returncode == 0:
+        if self._ensure_repo() is None:
             return {"ok": False, "error": "当前目录已是 git 仓库"}
         if dry_run:
             return {"ok": True, "dry_run": True, "cmd": "git init"}
         proc = self._run(["init"])
+        self._is_repo = proc.returncode == 0
         return {"ok": proc.returncode == 0, "stdout": proc.stdout, "stderr": proc.stderr}
 
     # 写操作
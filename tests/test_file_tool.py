@@ -0,0 +1,67 @@
+import shutil
+
+import pytest
+
+from gsa.tools.file_impl import BINARY_SNIFF_BYTES, FileTool
+
+
+def test_search_line_numbers_and_binary_skip(tmp_path):
+    (tmp_path / "a.txt").write_text("first\n  foo foo \nbar\n中文 foo\n", encoding="utf-8")
+    (tmp_path / "b.bin").write_bytes(b"foo\0\n")
+    (tmp_path / "empty.txt").write_text("", encoding="utf-8")
+    hits = FileTool(str(tmp_path)).search("foo")["hits"]
+    assert hits == [
+        {"file": "a.txt", "line": 2, "text": "foo foo"},
+        {"file": "a.txt", "line": 4, "text": "中文 foo"},
+    ]
+    assert len(FileTool(str(tmp_path)).search("foo", max_results=1)["hits"]) == 1
+
+
+def _search_tree(root):
+    (root / "b").mkdir()
+    (root / "b" / "x.txt").write_text("foo\n", encoding="utf-8")
+    (root / "a.txt").write_text("foo 1\nfoo 2\n", encoding="utf-8")
+    (root / "c.txt").write_text("foo c\n", encoding="utf-8")
+    (root / "late.bin").write_bytes(b"x\n" * BINARY_SNIFF_BYTES + b"foo late\n\0foo after\n")
+
+
+def test_search_order_is_deterministic(tmp_path):
+    _search_tree(tmp_path)
+    tool = FileTool(str(tmp_path))
+    tool._rg = None
+    hits = [(h["file"], h["line"]) for h in tool.search("foo")["hits"]]
+    # 文件与子目录按名称统一排序；开头之后才出现 NUL 的文件同样按二进制跳过
+    assert hits == [("a.txt", 1), ("a.txt", 2), ("b/x.txt", 1), ("c.txt", 1)]
+    assert tool.search("foo", max_results=3)["hits"] == tool.search("foo")["hits"][:3]
+
+
+@pytest.mark.skipif(shutil.which("rg") is None, reason="需要 ripgrep")
+def test_search_rg_matches_python_scan(tmp_path):
+    _search_tree(tmp_path)
+    tool = FileTool(str(tmp_path))
+    fast = [tool.search("foo", max_results=n) for n in (3, 50)]
+    tool._rg = None
+    assert fast == [tool.search("foo", max_results=n) for n in (3, 50)]
+
+
+def test_write_creates_new_empty_file(tmp_path):
+    result = FileTool(str(tmp_path)).write("pkg/__init__.py", "", dry_run=False)
+    assert result == {"ok": True, "diff": ""}
+    assert (tmp_path / "pkg" / "__init__.py").read_text(encoding="utf-8") == ""
+
+
+def test_write_unchanged_content_skips_diff(tmp_path):
+    (tmp_path / "a.txt").write_text("same\n", encoding="utf-8")
+    tool = FileTool(str(tmp_path))
+    assert tool.write("a.txt", "same\n", dry_run=False) == {"ok": True, "diff": "", "unchanged": True}
+    result = tool.write("a.txt", "new\n", dry_run=True)
+    assert "+new" in result["diff"]
+    assert tool.write("a.txt", "new\n", dry_run=True, include_diff=False)["diff"] == ""
+
+
+def test_patch_applies_unified_diff_in_process(tmp_path):
+    (tmp_path / "a.txt").write_bytes(b"one\r\ntwo\r\nthree\r\n")
+    diff = "--- a.txt\n+++ a.txt\n@@ -2,1 +2,1 @@\n-two\r\n+TWO\r\n"
+    tool = FileTool(str(tmp_path))
+    assert tool.patch("a.txt", diff, dry_run=False)["ok"] is True
+    assert (tmp_path / "a.txt").read_bytes() == b"one\r\nTWO\r\nthree\r\n"
@@ -0,0 +1,99 @@
+from gsa.tools.git_impl import GitTool
+
+
+def test_repo_check_cached_after_init(tmp_path):
+    tool = GitTool(str(tmp_path))
+    assert tool.status()["ok"] is False
+    assert tool.init_repo(dry_run=False)["ok"] is True
+    calls = []
+    run = tool._run
+    tool._run = lambda args: calls.append(args) or run(args)
+    assert tool.status()["ok"] is True
+    assert calls == [["status", "-sb"]]
+    assert tool.init_repo(dry_run=True)["ok"] is False
+
+
+def test_snapshot_returns_sections(tmp_path):
+    tool = GitTool(str(tmp_path))
+    tool.init_repo(dry_run=False)
+    result = tool.snapshot(["status", "branch", "log"])
+    assert set(result["sections"]) == {"status", "branch", "log"}
+    assert result["sections"]["status"] == {"ok": True, "stdout": tool.status()["stdout"]}
+    # 空仓库没有提交，log 单独失败
+    assert result["sections"]["log"]["ok"] is False
+    assert tool.snapshot(["bogus"])["ok"] is False
+
+
+def test_show_truncates_large_output(tmp_path, monkeypatch):
+    monkeypatch.setattr("gsa.tools.git_impl.SHOW_MAX_CHARS", 10)
+    tool = GitTool(str(tmp_path))
+    tool.init_repo(dry_run=False)
+    (tmp_path / "a.txt").write_text("a\n", encoding="utf-8")
+    tool._run(["add", "a.txt"])
+    tool._run(["-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "x" * 50])
+    result = tool.show()
+    assert result["ok"] is True
+    assert result["stdout"].endswith("...<输出截断>")
+    assert len(result["stdout"]) == 10 + len("\n...<输出截断>")
+
+
+def test_cat_object_reuses_one_process(tmp_path):
+    tool = GitTool(str(tmp_path))
+    tool.init_repo(dry_run=False)
+    (tmp_path / "a.txt").write_text("hello\n", encoding="utf-8")
+    tool._run(["add", "a.txt"])
+    tool._run(["-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init"])
+    try:
+        blob = tool.cat_object("HEAD:a.txt")
+        assert (blob["type"], blob["stdout"]) == ("blob", "hello\n")
+        proc = tool._cat_proc
+        assert tool.cat_object("HEAD")["type"] == "commit"
+        assert tool.cat_object("no-such-ref")["ok"] is False
+        assert tool.cat_object("HEAD:a.txt")["stdout"] == "hello\n"
+        assert tool._cat_proc is proc
+        assert tool.cat_object("HEAD:.env")["ok"] is False
+        tree = tool.cat_object("HEAD^{tree}")
+        assert tree["type"] == "tree"
+        assert tree["stdout"].rstrip("\n").endswith("\ta.txt")
+        assert tree["stdout"].startswith("100644 blob ")
+        assert tool.cat_object("HEAD:a.txt")["stdout"] == "hello\n"
+    finally:
+        tool.close()
+
+
+def test_cat_object_blocks_sensitive_blob_reads(tmp_path):
+    tool = GitTool(str(tmp_path))
+    tool.init_repo(dry_run=False)
+    (tmp_path / ".env").write_text("SECRET=1\n", encoding="utf-8")
+    (tmp_path / "a.txt").write_text("hello\n", encoding="utf-8")
+    tool._run(["add", "-f", ".env", "a.txt"])
+    tool._run(["-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init"])
+    try:
+        assert tool.cat_object(":0:.env")["ok"] is False
+        assert tool.cat_object(":.env")["ok"] is False
+        env_sha = tool._run(["rev-parse", "HEAD:.env"]).stdout.strip()
+        assert tool.cat_object(env_sha)["ok"] is False
+        assert "SECRET" not in str(tool.cat_object(env_sha))
+        assert tool.cat_object(":0:a.txt")["stdout"] == "hello\n"
+        missing = tool.cat_object("HEAD:my file missing")
+        assert missing == {"ok": False, "error": "对象不存在：HEAD:my file missing"}
+        proc = tool._cat_proc
+        assert tool.cat_object("HEAD:a.txt")["stdout"] == "hello\n"
+        assert tool._cat_proc is proc
+    finally:
+        tool.close()
+
+
+def test_cat_file_respawn_replaces_finalizer(tmp_path):
+    tool = GitTool(str(tmp_path))
+    tool.init_repo(dry_run=False)
+    try:
+        tool.cat_object("HEAD")
+        first = tool._cat_finalizer
+        tool._cat_proc.kill()
+        tool._cat_proc.wait()
+        tool.cat_object("HEAD")
+        assert not first.alive
+        assert tool._cat_finalizer.alive
+    finally:
+        tool.close()
@@ -0,0 +1,146 @@
+import numpy as np
+
+from gsa.tools.index_impl import SimpleHashEmbeddings, _token_hash
+
+
+def test_embed_counts_tokens_and_normalizes():
+    emb = SimpleHashEmbeddings(dim=16)
+    vec = np.array(emb.embed_query("a b a"))
+    expected = np.zeros(16)
+    for token in ["a", "b", "a"]:
+        expected[_token_hash(token) % 16] += 1.0
+    expected /= np.linalg.norm(expected)
+    assert np.allclose(vec, expected)
+    assert emb.embed_query("") == [0.0] * 16
+
+
+def test_embed_splits_tokens_on_punctuation():
+    emb = SimpleHashEmbeddings(dim=64)
+    assert np.allclose(emb.embed_query("foo.bar(baz)"), emb.embed_query("foo bar baz"))
+    assert emb.embed_query("...") == [0.0] * 64
+
+
+def test_embed_documents_matches_per_text_embedding():
+    emb = SimpleHashEmbeddings(dim=16)
+    texts = ["a b a", "", "c d e f"]
+    assert np.allclose(emb.embed_documents(texts), [emb.embed_query(t) for t in texts])
+
+
+def test_token_hash_is_stable_across_processes():
+    assert _token_hash("foo") == 2356372769
+
+
+def test_build_reuses_cached_chunk_embeddings(tmp_path, monkeypatch):
+    from gsa.tools.index_impl import IndexTool
+
+    (tmp_path / "a.txt").write_text("hello world", encoding="utf-8")
+    tool = IndexTool(str(tmp_path))
+    assert tool.build(dry_run=False)["ok"] is True
+    embedded = []
+    original = SimpleHashEmbeddings._embed_matrix
+    monkeypatch.setattr(
+        SimpleHashEmbeddings, "_embed_matrix", lambda self, texts: embedded.extend(texts) or original(self, texts)
+    )
+    (tmp_path / "b.txt").write_text("new file", encoding="utf-8")
+    assert tool.build(dry_run=False)["chunks"] == 2
+    assert embedded == ["new file"]
+
+
+def test_parallel_split_matches_serial():
+    from langchain_core.documents import Document
+
+    from gsa.tools.index_impl import _split_one, _split_parallel
+
+    docs = [Document(page_content=("word " * 300) + str(i), metadata={"source": str(i)}) for i in range(3)]
+    serial = [c for d in docs for c in _split_one(d.page_content, d.metadata, 200, 20)]
+    assert _split_parallel(docs, 200, 20, num_workers=2) == serial
+
+
+def test_build_skips_minified_files(tmp_path):
+    from gsa.tools.index_impl import MAX_SINGLE_LINE_CHARS, IndexTool
+
+    (tmp_path / "a.txt").write_text("hello world", encoding="utf-8")
+    (tmp_path / "big.json").write_text("x" * (MAX_SINGLE_LINE_CHARS + 1), encoding="utf-8")
+    (tmp_path / "gbk.txt").write_bytes("中文说明".encode("gbk"))
+    result = IndexTool(str(tmp_path)).build(dry_run=False)
+    assert (result["docs"], sorted(result["skipped"])) == (1, ["big.json", "gbk.txt"])
+
+
+def test_large_index_uses_ivf_pq(tmp_path, monkeypatch):
+    from gsa.tools import index_impl
+
+    monkeypatch.setattr(index_impl, "IVF_PQ_MIN_CHUNKS", 50)
+    monkeypatch.setattr(index_impl, "IVF_PQ_FACTORY", "IVF2,PQ16x4fs")
+    for i in range(60):
+        (tmp_path / f"f{i}.txt").write_text(f"doc{i} " + " ".join(f"t{i * 7 + j}" for j in range(20)), encoding="utf-8")
+    tool = index_impl.IndexTool(str(tmp_path))
+    assert tool.build(dry_run=False)["chunks"] == 60
+    assert "IVF" in type(tool._load_vectorstore().index).__name__
+    assert tool.search("doc3 t21 t22 t23", top_k=1)["results"][0]["source"].endswith("f3.txt")
+
+
+def test_small_index_is_scalar_quantized(tmp_path):
+    from gsa.tools.index_impl import IndexTool
+
+    (tmp_path / "a.txt").write_text("alpha beta gamma", encoding="utf-8")
+    (tmp_path / "b.txt").write_text("delta epsilon", encoding="utf-8")
+    tool = IndexTool(str(tmp_path))
+    tool.build(dry_run=False)
+    assert type(tool._load_vectorstore().index).__name__ == "IndexScalarQuantizer"
+    assert tool.search("delta epsilon", top_k=1)["results"][0]["source"].endswith("b.txt")
+
+
+def test_embed_query_is_memoized():
+    emb = SimpleHashEmbeddings(dim=16)
+    first = emb.embed_query("a b")
+    first.append(1.0)
+    assert emb.embed_query("a b") == first[:-1]
+    assert emb._query_cache.cache_info().hits == 1
+
+
+def test_build_embeds_in_batches(tmp_path, monkeypatch):
+    from gsa.tools import index_impl
+
+    monkeypatch.setattr(index_impl, "EMBED_BATCH_SIZE", 2)
+    for i in range(5):
+        (tmp_path / f"f{i}.txt").write_text(f"word{i} shared", encoding="utf-8")
+    tool = index_impl.IndexTool(str(tmp_path))
+    assert tool.build(dry_run=False)["chunks"] == 5
+    assert tool._load_vectorstore().index.ntotal == 5
+    assert tool.search("word4 shared", top_k=1)["results"][0]["source"].endswith("f4.txt")
+
+
+def test_vectorstore_is_cached_until_rebuild(tmp_path):
+    from gsa.tools.index_impl import IndexTool
+
+    (tmp_path / "a.txt").write_text("alpha beta", encoding="utf-8")
+    tool = IndexTool(str(tmp_path))
+    assert tool._load_vectorstore() is None
+    tool.build(dry_run=False)
+    first = tool._load_vectorstore()
+    assert IndexTool(str(tmp_path))._load_vectorstore() is not first
+    assert tool._load_vectorstore() is first
+    (tmp_path / "b.txt").write_text("gamma", encoding="utf-8")
+    tool.build(dry_run=False)
+    assert tool._load_vectorstore() is not first
+
+
+def test_build_applies_exclude_globs(tmp_path):
+    from gsa.tools.index_impl import IndexTool
+
+    (tmp_path / "keep.txt").write_text("keep me", encoding="utf-8")
+    (tmp_path / "vendor").mkdir()
+    (tmp_path / "vendor" / "lib.py").write_text("x = 1", encoding="utf-8")
+    (tmp_path / "notes.md").write_text("drop me", encoding="utf-8")
+    res = IndexTool(str(tmp_path)).build(exclude_globs=["**/vendor/**", "*.md"], dry_run=True)
+    assert res["docs"] == 1
+
+
+def test_dry_run_estimates_without_reading(tmp_path, monkeypatch):
+    from gsa.tools import index_impl
+
+    (tmp_path / "a.txt").write_text("x" * 1500, encoding="utf-8")
+    (tmp_path / "b.md").write_text("short", encoding="utf-8")
+    monkeypatch.setattr(index_impl, "_read_document", None)
+    res = index_impl.IndexTool(str(tmp_path)).build(chunk_size=800, overlap=100, dry_run=True)
+    assert (res["docs"], res["chunks"], res["estimated"]) == (2, 4, True)
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+
+from gsa.llm.llm_client import LLMClient, LLMConfig, _coalesce, load_config
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    text = body["messages"][-1]["content"]
+    if body.get("stream"):
+        lines = [
+            "data: " + json.dumps({"choices": [{"delta": {"content": ch}}]}) for ch in text
+        ] + ["data: [DONE]"]
+        return httpx.Response(200, text="\n\n".join(lines))
+    return httpx.Response(200, json={"choices": [{"message": {"content": text.upper()}}]})
+
+
+def _mock_llm(handler, max_retries=2):
+    llm = LLMClient(LLMConfig(api_key="k", base_url="http://test/", max_retries=max_retries))
+    clients = []
+
+    def new_aclient():
+        clients.append(httpx.AsyncClient(base_url="http://test/", transport=httpx.MockTransport(handler)))
+        return clients[-1]
+
+    llm._new_aclient = new_aclient
+    return llm, clients
+
+
+def test_async_chat_gather_and_stream():
+    llm, clients = _mock_llm(_handler)
+
+    async def run():
+        texts = await llm.gather_chats([[{"role": "user", "content": c}] for c in ("a", "b", "c")])
+        chunks = [c async for c in llm.achat_stream([{"role": "user", "content": "xyz"}])]
+        return texts, chunks
+
+    texts, chunks = asyncio.run(run())
+    assert texts == ["A", "B", "C"]
+    assert chunks == ["x", "y", "z"]
+    # gather_chats 共用一个客户端；每次用完都已关闭，不会跨事件循环遗留连接池
+    assert asyncio.run(llm.achat_text([{"role": "user", "content": "d"}])) == "D"
+    assert len(clients) == 3
+    assert all(c.is_closed for c in clients)
+
+
+def test_async_chat_retries_transient_status(monkeypatch):
+    monkeypatch.setattr("gsa.llm.llm_client.RETRY_BASE_DELAY", 0.0)
+    statuses = [429, 503]
+
+    def flaky(request):
+        if statuses:
+            return httpx.Response(statuses.pop(0), headers={"Retry-After": "0"})
+        return _handler(request)
+
+    llm, _ = _mock_llm(flaky)
+    assert asyncio.run(llm.achat_text([{"role": "user", "content": "ok"}])) == "OK"
+
+    statuses[:] = [500, 500]
+    llm, _ = _mock_llm(flaky, max_retries=1)
+    with pytest.raises(httpx.HTTPStatusError) as exc:
+        asyncio.run(llm.achat_text([{"role": "user", "content": "ok"}]))
+    assert exc.value.response.status_code == 500
+
+
+def test_load_config_reloads_after_file_change(tmp_path, monkeypatch):
+    monkeypatch.delenv("GLM_MODEL", raising=False)
+    monkeypatch.delenv("GSA_MODEL", raising=False)
+    cfg_path = tmp_path / "config.yaml"
+    cfg_path.write_text("GLM_MODEL: model-a\n", encoding="utf-8")
+    first = load_config(str(tmp_path))
+    assert first.model == "model-a"
+    first.model = "changed"
+    assert load_config(str(tmp_path)).model == "model-a"
+
+    cfg_path.write_text("GLM_MODEL: model-b\n", encoding="utf-8")
+    stat = cfg_path.stat()
+    os.utime(cfg_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert load_config(str(tmp_path)).model == "model-b"
+
+
+def test_coalesce_merges_small_chunks():
+    chunks = ["a"] * 130
+    merged = list(_coalesce(chunks, flush_ms=60_000, flush_chars=64))
+    assert merged == ["a" * 64, "a" * 64, "aa"]
+    assert list(_coalesce(chunks, flush_ms=0, flush_chars=1000)) == chunks
@@ -0,0 +1,15 @@
+import json
+
+from gsa.observability.logger import EventLogger
+
+
+def test_log_batch_appends_one_line_per_event(tmp_path):
+    logger = EventLogger(str(tmp_path), "t1")
+    logger.log("RUN_START", {"workspace": "ws"})
+    logger.log_batch([("STEP_DRYRUN", {"tool": "git_status"}), ("RUN_SUMMARY", {"summary": "完成"})])
+    logger.log_batch([])
+    logger.flush()
+
+    with open(logger.path, encoding="utf-8") as f:
+        events = [json.loads(line)["event"] for line in f]
+    assert events == ["RUN_START", "STEP_DRYRUN", "RUN_SUMMARY"]
@@ -0,0 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from gsa.mcp.client import InProcessMCPClient, MCPClient
+
+
+def test_call_tools_pipelines_and_keeps_order(tmp_path):
+    (tmp_path / "a.txt").write_text("hello", encoding="utf-8")
+    client = MCPClient(str(tmp_path))
+    try:
+        results = client.call_tools(
+            [
+                ("file_read", {"path": "a.txt"}),
+                ("no_such_tool", {}),
+                ("file_list", {"dir": "."}),
+            ]
+        )
+        assert results[0] == client.call_tool("file_read", {"path": "a.txt"})
+        assert isinstance(results[1], RuntimeError)
+        assert results[2] == client.call_tool("file_list", {"dir": "."})
+    finally:
+        client.close()
+
+
+def test_in_process_client_matches_stdio(tmp_path):
+    (tmp_path / "a.txt").write_text("hello", encoding="utf-8")
+    remote = MCPClient(str(tmp_path))
+    local = InProcessMCPClient(str(tmp_path))
+    try:
+        assert local.list_tools() == remote.list_tools()
+        assert local.call_tool("file_read", {"path": "a.txt"}) == remote.call_tool("file_read", {"path": "a.txt"})
+        results = local.call_tools([("no_such_tool", {}), ("file_list", {"dir": "."})])
+        assert isinstance(results[0], RuntimeError)
+        assert results[1] == remote.call_tool("file_list", {"dir": "."})
+    finally:
+        remote.close()
+        local.close()
+
+
+def test_concurrent_calls_get_their_own_responses(tmp_path):
+    for i in range(8):
+        (tmp_path / f"f{i}.txt").write_text(f"content {i}", encoding="utf-8")
+    client = MCPClient(str(tmp_path))
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda i: client.call_tool("file_read", {"path": f"f{i}.txt"}), range(8)))
+        assert [r["content"] for r in results] == [f"content {i}" for i in range(8)]
+        batch = client.call_tools([("file_read", {"path": "f0.txt"})] * 200)
+        assert all(r["content"] == "content 0" for r in batch)
+    finally:
+        client.close()
+
+
+def test_execute_does_not_prefetch_in_process(tmp_path, monkeypatch):
+    from gsa.agent.orchestrator import Orchestrator
+    from gsa.agent.schema import Plan, Step
+
+    (tmp_path / "a.txt").write_text("hello", encoding="utf-8")
+    orch = Orchestrator(str(tmp_path), use_llm=False)
+    try:
+        assert orch.mcp.pipelined is False
+        monkeypatch.setattr(orch.mcp, "call_tools", None)
+        step = Step(tool="file_read", args={"path": "a.txt"}, safety_level="low", safety_reason="read")
+        out = orch.execute(Plan(intent="read", steps=[step, step]), trace_id="t1")
+        assert [r["ok"] for r in out["results"]] == [True, True]
+    finally:
+        orch.close()
+
+
+def test_evicted_orchestrator_stays_usable_until_released(tmp_path, monkeypatch):
+    import gc
+
+    from gsa.app import shared
+
+    monkeypatch.setattr(shared, "MAX_ORCHESTRATORS", 1)
+    monkeypatch.setattr(shared, "_ORCH", type(shared._ORCH)())
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    (tmp_path / "a" / "x.txt").write_text("hi", encoding="utf-8")
+    first = shared.get_orchestrator(str(tmp_path / "a"))
+    closed = []
+    server_close = first.mcp.server.close
+    first.mcp.server.close = lambda: closed.append(True) or server_close()
+    shared.get_orchestrator(str(tmp_path / "b"))
+    # 被淘汰后仍有会话持有引用，调用不受影响
+    assert first.mcp.call_tool("file_read", {"path": "x.txt"})["ok"] is True
+    assert closed == []
+    del first
+    gc.collect()
+    assert closed == [True]
+    shared._ORCH.clear()
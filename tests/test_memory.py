@@ -0,0 +1,27 @@
+import gc
+import os
+
+from gsa.agent import memory
+from gsa.agent.memory import MemoryStore
+
+
+def test_record_op_coalesces_writes_until_flush(tmp_path):
+    store = MemoryStore(str(tmp_path))
+    store.record_op("共执行 1 步，成功 1 步。")
+    assert not os.path.exists(store.path)
+
+    store.flush()
+    reloaded = MemoryStore(str(tmp_path))
+    assert list(reloaded.persist.recent_ops) == ["共执行 1 步，成功 1 步。"]
+    assert reloaded.persist.common_workspaces == [str(tmp_path)]
+
+
+def test_exit_hook_flushes_live_stores_without_pinning_them(tmp_path):
+    store = MemoryStore(str(tmp_path))
+    store.record_op("op")
+    memory._flush_all()
+    assert os.path.exists(store.path)
+
+    del store
+    gc.collect()
+    assert not any(s.workspace == str(tmp_path) for s in memory._STORES)
@@ -0,0 +1,126 @@
+import asyncio
+
+from gsa.agent.planner import Planner, RulePlanner
+
+
+def test_rule_planner_init_git_allows_whitespace():
+    planner = RulePlanner()
+    for text in ["请帮我初始化git", "初始化 git 仓库", "git init"]:
+        tools = [s.tool for s in planner.plan(text).steps]
+        assert "git_init" in tools
+
+
+class _FakeClient:
+    def __init__(self, text: str):
+        self.text = text
+        self.calls = 0
+
+    def chat_text(self, messages, temperature=None, max_tokens=None):
+        self.calls += 1
+        return self.text
+
+    async def achat_text(self, messages, temperature=None, max_tokens=None):
+        return self.chat_text(messages, temperature, max_tokens)
+
+    def chat_stream_batched(self, messages, temperature=None, max_tokens=None):
+        self.calls += 1
+        for i in range(0, len(self.text), 7):
+            yield self.text[i : i + 7]
+
+
+def test_planner_reuses_cached_llm_plan(tmp_path, monkeypatch):
+    planner = Planner(str(tmp_path))
+    client = _FakeClient(
+        '{"intent": "查看状态", "steps": [{"tool": "git_status", "args": {},'
+        ' "safety_level": "low", "safety_reason": "只读操作", "dry_run": true}]}'
+    )
+    monkeypatch.setattr(planner, "_get_llm_client", lambda: client)
+
+    first = planner.plan("看看  仓库状态")
+    second = planner.plan("看看 仓库状态")
+    assert client.calls == 1
+    assert not first.cache_hit and second.cache_hit
+    assert second.plan.model_dump() == first.plan.model_dump()
+    second.plan.steps[0].dry_run = False
+    assert planner.plan("看看 仓库状态").plan.steps[0].dry_run is True
+
+
+def test_planner_falls_back_to_rules_on_non_json(tmp_path, monkeypatch):
+    planner = Planner(str(tmp_path))
+    monkeypatch.setattr(planner, "_get_llm_client", lambda: _FakeClient("好的，我来帮你查看状态。"))
+
+    result = planner.plan("查看状态")
+    assert result.errors and "解析失败" in result.errors[0]
+    assert [s.tool for s in result.plan.steps] == ["git_status"]
+
+
+def test_async_plan_shares_cache_with_sync_plan(tmp_path, monkeypatch):
+    planner = Planner(str(tmp_path))
+    client = _FakeClient(
+        '{"intent": "查看状态", "steps": [{"tool": "git_status", "args": {},'
+        ' "safety_level": "low", "safety_reason": "只读操作", "dry_run": true}]}'
+    )
+    monkeypatch.setattr(planner, "_get_llm_client", lambda: client)
+
+    first = asyncio.run(planner.aplan("查看状态"))
+    assert [s.tool for s in first.plan.steps] == ["git_status"]
+    assert planner.plan("查看状态").cache_hit and client.calls == 1
+
+
+def test_plan_stream_yields_chunks_then_returns_result(tmp_path, monkeypatch):
+    planner = Planner(str(tmp_path))
+    text = (
+        '{"intent": "查看状态", "steps": [{"tool": "git_status", "args": {},'
+        ' "safety_level": "low", "safety_reason": "只读操作", "dry_run": true}]}'
+    )
+    monkeypatch.setattr(planner, "_get_llm_client", lambda: _FakeClient(text))
+
+    gen = planner.plan_stream("查看状态")
+    chunks = []
+    try:
+        while True:
+            chunks.append(next(gen))
+    except StopIteration as stop:
+        result = stop.value
+    assert "".join(chunks) == text and len(chunks) > 1
+    assert [s.tool for s in result.plan.steps] == ["git_status"]
+    assert planner.plan("查看状态").cache_hit
+
+
+def test_llm_eval_fans_out_plans_concurrently(tmp_path, monkeypatch):
+    import contextlib
+
+    from gsa.agent.orchestrator import Orchestrator
+    from gsa.eval import runner
+
+    plan_json = (
+        '{"intent": "查看状态", "steps": [{"tool": "git_status", "args": {},'
+        ' "safety_level": "low", "safety_reason": "只读操作", "dry_run": true}]}'
+    )
+    state = {"active": 0, "peak": 0, "sessions": 0}
+
+    class _AsyncClient(_FakeClient):
+        async def achat_text(self, messages, temperature=None, max_tokens=None):
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            await asyncio.sleep(0.01)
+            state["active"] -= 1
+            return self.chat_text(messages)
+
+        @contextlib.asynccontextmanager
+        async def asession(self):
+            state["sessions"] += 1
+            yield
+
+    orch = Orchestrator(str(tmp_path), use_llm=True)
+    client = _AsyncClient(plan_json)
+    monkeypatch.setattr(orch.planner, "_get_llm_client", lambda: client)
+    monkeypatch.setenv("GSA_EVAL_CONCURRENCY", "3")
+    try:
+        cases = [{"name": str(i), "input": f"查看状态 {i}", "expect_tool_contains": ["git_status"]} for i in range(6)]
+        results = asyncio.run(runner._evaluate_all(orch, cases))
+    finally:
+        orch.close()
+    assert all(r["passed"] for r in results)
+    assert client.calls == 6
+    assert (state["peak"], state["sessions"]) == (3, 1)
@@ -1,7 +1,7 @@
 import os
 import pytest
 
-from gsa.safety.policy import PolicyError, ensure_in_workspace
+from gsa.safety.policy import PolicyError, ensure_in_workspace, validate_git_args
 
 
 def test_ensure_in_workspace_allows_child(tmp_path):
@@ -14,3 +14,9 @@ def test_ensure_in_workspace_blocks_escape(tmp_path):
     workspace = tmp_path
     with pytest.raises(PolicyError):
         ensure_in_workspace(str(workspace), "/etc/passwd")
+
+
+def test_validate_git_args_blocks_dangerous_phrases():
+    validate_git_args(["status", "-sb"])
+    with pytest.raises(PolicyError, match="push --force"):
+        validate_git_args(["push", "--force", "origin"])
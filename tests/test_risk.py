@@ -1,4 +1,4 @@
-from gsa.safety.risk import assess_risk
+from gsa.safety.risk import STATIC_RISK, assess_risk
 
 
 def test_risk_high_for_delete_branch():
@@ -9,3 +9,8 @@ def test_risk_high_for_delete_branch():
 def test_risk_high_for_file_write():
     level, _ = assess_risk("file_write", {"path": "a.txt"})
     assert level == "high"
+
+
+def test_static_risk_matches_assess_risk():
+    for tool, risk in STATIC_RISK.items():
+        assert assess_risk(tool, {"path": "a.txt", "force": True, "create": True}) == risk
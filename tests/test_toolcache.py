@@ -0,0 +1,46 @@
+import os
+from types import SimpleNamespace
+
+from gsa.app.toolcache import cached_call_tool
+
+
+class _FakeMCP:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def call_tool(self, name, args):
+        self.calls += 1
+        return dict(self.result)
+
+
+def _write_meta(tmp_path):
+    meta = tmp_path / ".gsa" / "index_meta.json"
+    meta.parent.mkdir(exist_ok=True)
+    meta.write_text("{}", encoding="utf-8")
+    return meta
+
+
+def test_cached_call_tool_reuses_result_until_index_rebuilt(tmp_path):
+    meta = _write_meta(tmp_path)
+    mcp = _FakeMCP({"ok": True, "summary": "概览", "fallback": False})
+    orch = SimpleNamespace(workspace=str(tmp_path), mcp=mcp)
+
+    assert cached_call_tool(orch, "repo_summarize", {})["summary"] == "概览"
+    assert cached_call_tool(orch, "repo_summarize", {})["summary"] == "概览"
+    assert mcp.calls == 1
+
+    st = meta.stat()
+    os.utime(meta, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    cached_call_tool(orch, "repo_summarize", {})
+    assert mcp.calls == 2
+
+
+def test_cached_call_tool_skips_fallback_results(tmp_path):
+    _write_meta(tmp_path)
+    mcp = _FakeMCP({"ok": True, "answer": "未配置 API Key，无法生成回答。", "fallback": True})
+    orch = SimpleNamespace(workspace=str(tmp_path), mcp=mcp)
+
+    cached_call_tool(orch, "index_qa", {"query": "q", "top_k": 6})
+    cached_call_tool(orch, "index_qa", {"query": "q", "top_k": 6})
+    assert mcp.calls == 2
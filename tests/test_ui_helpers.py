@@ -0,0 +1,18 @@
+import pytest
+
+ui = pytest.importorskip("gsa.app.ui", exc_type=ImportError)
+
+
+@pytest.mark.parametrize("query", ["这段代码做什么", "解释这个函数", "类名是什么", "这个类有哪些方法", "show me the code"])
+def test_code_query_keywords(query):
+    assert ui._is_code_like("plain answer", query)
+
+
+@pytest.mark.parametrize("query", ["如何分类文件", "人类可读的说明", "类似的问题", "这类提交", "encode the data"])
+def test_prose_queries_are_not_code(query):
+    assert not ui._is_code_like("plain answer", query)
+
+
+def test_code_signatures_only_at_line_start():
+    assert ui._is_code_like("x = 1\n    def f():\n", "")
+    assert not ui._is_code_like("it came from the docs", "")